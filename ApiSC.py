@@ -6,26 +6,29 @@ Client ID: apiSC
 
 import time
 import threading
-import requests
+import NetSC
+import LogSC
 
 # -------------------------
 # Common Helpers
 # -------------------------
+_log = LogSC.get_logger("LOG")
+
 class Common:
     @staticmethod
     def log(message):
-        print(f"[LOG] {message}")
+        _log.info(message)
 
     @staticmethod
     def api_request(url, method="GET", data=None, headers=None):
         try:
             if method == "GET":
-                resp = requests.get(url, headers=headers)
+                resp = NetSC.get(url, headers=headers)
             else:
-                resp = requests.post(url, json=data, headers=headers)
+                resp = NetSC.post(url, json=data, headers=headers)
             return resp.json()
         except Exception as e:
-            Common.log(f"API request error: {e}")
+            _log.error("API request error: %s", e)
             return None
 
 # -------------------------
@@ -95,19 +98,19 @@ class ServerClient:
     def send_heartbeat(self):
         while self.running:
             try:
-                requests.post(f"{SERVER_URL}/heartbeat", json={"client_id": self.client_id})
+                NetSC.post(f"{SERVER_URL}/heartbeat", json={"client_id": self.client_id}, retries=1)
                 Common.log("Heartbeat sent")
             except Exception as e:
-                Common.log(f"Heartbeat error: {e}")
+                _log.error("Heartbeat error: %s", e)
             time.sleep(10)
 
     def fetch_task(self):
         try:
-            resp = requests.get(f"{SERVER_URL}/get_task?client_id={self.client_id}")
+            resp = NetSC.get(f"{SERVER_URL}/get_task", params={"client_id": self.client_id})
             if resp.status_code == 200 and resp.json().get("task"):
                 return resp.json()["task"]
         except Exception as e:
-            Common.log(f"Fetch task error: {e}")
+            _log.error("Fetch task error: %s", e)
         return None
 
 # -------------------------
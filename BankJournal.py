@@ -0,0 +1,233 @@
+"""
+bankJournal.py - Write-ahead journal for BankSC
+บันทึกทุกการเปลี่ยนแปลงยอดเงินก่อนตอบกลับ, group commit (หลายรายการต่อหนึ่ง fsync),
+snapshot เป็นระยะ และกู้คืนจาก snapshot + journal ที่เหลือ
+"""
+
+import json
+import os
+import threading
+import time
+
+import LogSC
+
+_log = LogSC.get_logger("JOURNAL")
+
+# -------------------------
+# Journal
+# -------------------------
+# sync modes, from most to least durable:
+#   "always" - every commit flushes and fsyncs before returning
+#   "group"  - commits wait for a background fsync that covers every
+#              record appended so far (one fsync for many transfers)
+#   "async"  - commits return at once; fsync every ``interval`` seconds
+#   "none"   - flushed to the OS every ``interval`` seconds, never fsynced
+SYNC_MODES = ("always", "group", "async", "none")
+SNAPSHOT_FILE = "snapshot.json"
+SEGMENT_SUFFIX = ".wal"
+
+class Journal:
+    """JSON-lines journal of balance changes in ``path``.
+
+    Records are {"seq", "op", ...}: "create" carries name/country/balance,
+    "create_many" a list of [name, country, balance] ("accounts"), every
+    other op a "deltas" {account name: change} and, for keyed transfers,
+    the idempotency "key". Segment files are
+    named after their first seq; a snapshot rotates to a new segment and
+    deletes the ones it covers.
+    """
+
+    def __init__(self, path="bank_journal", sync="group", interval=0.05, group_window=0.0,
+                 snapshot_every=100_000, snapshot_interval=300):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {sync}")
+        self.path = path
+        self.sync = sync
+        self.interval = interval
+        self.group_window = group_window
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+        self._seq = 0          # last appended
+        self._durable = 0      # last covered by flush (+ fsync)
+        self._snap_seq = 0     # last covered by the snapshot
+        self._snap_time = time.monotonic()
+        self._file = None
+        self._segment = None
+        self._checkpoint = None
+        self._closed = False
+        self._threads = []
+        self._lock = threading.Lock()        # appends and the open file
+        self._sync_lock = threading.Lock()   # fsync vs rotation; taken before _lock
+        self._pending = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        os.makedirs(path, exist_ok=True)
+
+    def _segments(self):
+        names = sorted(n for n in os.listdir(self.path) if n.endswith(SEGMENT_SUFFIX))
+        return [(int(n[:-len(SEGMENT_SUFFIX)]), os.path.join(self.path, n)) for n in names]
+
+    def _open_segment(self, first_seq):
+        self._segment = os.path.join(self.path, f"{first_seq:016d}{SEGMENT_SUFFIX}")
+        self._file = open(self._segment, "a", encoding="utf-8")
+
+    # --- Recovery ---
+    def recover(self, apply):
+        """Replay the snapshot and journal tail through ``apply(record)``; returns the record count."""
+        count = 0
+        snapshot = os.path.join(self.path, SNAPSHOT_FILE)
+        if os.path.exists(snapshot):
+            with open(snapshot, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            apply({"op": "create_many", "accounts": data["accounts"]})
+            if data.get("keys"):
+                apply({"op": "keys", "keys": data["keys"]})
+            self._snap_seq = self._seq = data["seq"]
+        for _, segment in self._segments():
+            with open(segment, "rb") as f:
+                offset = 0
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("torn record")
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash mid-write leaves a partial last line; it was
+                        # never acknowledged, so drop it.
+                        _log.warning("Truncating torn tail of %s at %s", segment, offset)
+                        with open(segment, "r+b") as g:
+                            g.truncate(offset)
+                        break
+                    offset += len(line)
+                    if record["seq"] > self._seq:
+                        apply(record)
+                        self._seq = record["seq"]
+                        count += 1
+        self._durable = self._seq
+        return count
+
+    def start(self, checkpoint=None):
+        """Open a segment for appends and start the background threads.
+
+        ``checkpoint()`` is called when a snapshot is due; it must call
+        ``rotate`` and ``write_snapshot`` with a consistent state.
+        """
+        self._checkpoint = checkpoint
+        self._open_segment(self._seq + 1)
+        if self.sync != "always":
+            self._threads.append(threading.Thread(target=self._commit_loop, daemon=True))
+        if checkpoint is not None:
+            self._threads.append(threading.Thread(target=self._snapshot_loop, daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    # --- Appends and Commits ---
+    def append(self, record):
+        """Buffer ``record`` and return its seq; call while holding the locks that ordered it."""
+        with self._lock:
+            self._seq += 1
+            record["seq"] = self._seq
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._pending.notify()
+            return self._seq
+
+    def commit(self, seq):
+        """Return once record ``seq`` is as durable as the sync mode promises."""
+        if self.sync == "always":
+            if self._durable < seq:
+                self._flush(fsync=True)
+        elif self.sync == "group":
+            with self._lock:
+                self._synced.wait_for(lambda: self._durable >= seq or self._closed)
+
+    def _flush(self, fsync):
+        with self._sync_lock:
+            with self._lock:
+                target = self._seq
+                if target <= self._durable:
+                    return
+                self._file.flush()
+                fd = self._file.fileno()
+            if fsync:
+                os.fsync(fd)
+            with self._lock:
+                self._durable = max(self._durable, target)
+                self._synced.notify_all()
+
+    def _commit_loop(self):
+        while not self._stop.is_set():
+            if self.sync == "group":
+                with self._lock:
+                    self._pending.wait_for(lambda: self._seq > self._durable or self._stop.is_set())
+                if self.group_window:
+                    time.sleep(self.group_window)  # let more transfers join this fsync
+            else:
+                self._stop.wait(self.interval)
+            self._flush(fsync=self.sync != "none")
+
+    # --- Snapshots ---
+    def _snapshot_loop(self):
+        while not self._stop.wait(1.0):
+            behind = self._seq - self._snap_seq
+            if behind >= self.snapshot_every or (
+                    behind and time.monotonic() - self._snap_time >= self.snapshot_interval):
+                self.snapshot()
+
+    def snapshot(self):
+        try:
+            self._checkpoint()
+        except Exception as e:
+            _log.error("Snapshot failed: %s", e)
+
+    def rotate(self):
+        """Seal the current segment and start a new one; returns the last seq it holds.
+
+        Call with every writer blocked so the snapshot taken alongside is
+        exactly the state after that seq.
+        """
+        with self._sync_lock, self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._durable = self._seq
+            self._synced.notify_all()
+            self._open_segment(self._seq + 1)
+            return self._seq
+
+    def write_snapshot(self, seq, accounts, keys=()):
+        """Persist [(name, country, balance)] and applied idempotency ``keys``
+        as of ``seq`` and drop the segments it covers."""
+        tmp = os.path.join(self.path, SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "accounts": accounts, "keys": list(keys)}, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, SNAPSHOT_FILE))
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self._snap_seq, self._snap_time = seq, time.monotonic()
+        for first, segment in self._segments():
+            if first <= seq and segment != self._segment:
+                os.remove(segment)
+
+    def stats(self):
+        return {"seq": self._seq, "durable": self._durable, "snapshot": self._snap_seq, "sync": self.sync}
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._pending.notify_all()
+        for t in self._threads:
+            t.join()
+        if self._file is not None:
+            self._flush(fsync=self.sync != "none")
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._closed = True
+            self._synced.notify_all()
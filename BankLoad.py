@@ -0,0 +1,201 @@
+"""
+bankLoad.py - Load generator for BankSC transfers
+ยิงธุรกรรมโอนเงินตาม TPS ที่กำหนด ไปยัง BankSystem (in-process) หรือ /transfer (HTTP)
+แล้วรายงาน throughput, p50/p95/p99 latency และอัตราความล้มเหลวเป็น JSON
+
+    python BankLoad.py --target inproc --accounts 100000 --skew zipf --tps 5000 --concurrency 8
+    python BankLoad.py --target http --url http://localhost:5000 --tps 200 --duration 30
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from bisect import bisect
+from itertools import accumulate
+
+import BankSC
+import LogSC
+
+# -------------------------
+# Account Selection
+# -------------------------
+def make_sampler(n, skew="uniform", zipf_s=1.1):
+    """Return ``pick(rng) -> account index``; under "zipf" index k has weight 1/(k+1)**s."""
+    if skew == "uniform":
+        return lambda rng: rng.randrange(n)
+    if skew != "zipf":
+        raise ValueError(f"Unknown skew: {skew}")
+    cum = list(accumulate(1 / (k + 1) ** zipf_s for k in range(n)))
+    total = cum[-1]
+    return lambda rng: min(bisect(cum, rng.random() * total), n - 1)
+
+def account_name(i):
+    return f"LOAD_{i:07d}"
+
+# -------------------------
+# Targets
+# -------------------------
+# A target's transfer(from_name, to_name, amount) returns "ok", "declined"
+# (insufficient funds) or "error", or raises.
+class InProcessTarget:
+    def __init__(self, args):
+        if not args.log:
+            LogSC.configure(loggers={"BANKSC": {"level": "warning"}})
+        journal = None
+        if args.journal:
+            from BankJournal import Journal
+            journal = Journal(args.journal, sync=args.sync)
+        self.bank = BankSC.BankSystem(journal=journal)
+        self.bank.create_accounts(("LOAD", account_name(i), args.balance)
+                                  for i in range(args.accounts) if account_name(i) not in self.bank.accounts)
+        self.accounts = [self.bank.accounts[account_name(i)] for i in range(args.accounts)]
+
+    def transfer(self, from_i, to_i, amount):
+        return "ok" if self.bank.transfer(self.accounts[from_i], self.accounts[to_i], amount) else "declined"
+
+    def close(self):
+        self.bank.close()
+
+class HttpTarget:
+    def __init__(self, args):
+        import NetSC
+        self.url = args.url.rstrip("/")
+        self.transport = NetSC.Transport(pool_size=args.concurrency, retries=0)
+        if args.setup:
+            for start in range(0, args.accounts, 10_000):
+                rows = [{"country": "LOAD", "name": account_name(i), "balance": args.balance}
+                        for i in range(start, min(start + 10_000, args.accounts))]
+                r = self.transport.post(f"{self.url}/accounts", json=rows)
+                if r.status_code != 409:  # 409: created by an earlier run
+                    r.raise_for_status()
+
+    def transfer(self, from_i, to_i, amount):
+        r = self.transport.get(f"{self.url}/transfer", params={
+            "from_acc": account_name(from_i), "to_acc": account_name(to_i), "amount": amount})
+        if r.status_code != 200:
+            return "error"
+        body = r.json()
+        if body.get("success"):
+            return "ok"
+        return "error" if body.get("error") else "declined"
+
+    def close(self):
+        self.transport.close()
+
+TARGETS = {"inproc": InProcessTarget, "http": HttpTarget}
+
+# -------------------------
+# Load Loop
+# -------------------------
+def _worker(target, args, pick, seed, start, stop, out):
+    # Open loop: with a target TPS each worker sends on its own fixed
+    # schedule, and latency is measured from the scheduled send time, so a
+    # stalled target shows up as latency instead of as fewer requests.
+    rng = random.Random(seed)
+    period = args.concurrency / args.tps if args.tps else 0
+    counts = {"ok": 0, "declined": 0, "error": 0}
+    latencies = []
+    due = start + rng.random() * period
+    while True:
+        if period:
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent = due
+            due += period
+        else:
+            sent = time.perf_counter()
+        if sent >= stop:
+            break
+        from_i = pick(rng)
+        to_i = pick(rng)
+        while to_i == from_i and args.accounts > 1:
+            to_i = pick(rng)
+        try:
+            result = target.transfer(from_i, to_i, rng.randint(args.min_amount, args.max_amount))
+        except Exception:
+            result = "error"
+        latencies.append(time.perf_counter() - sent)
+        counts[result] += 1
+    out.append((counts, latencies))
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def run(args):
+    target = TARGETS[args.target](args)
+    pick = make_sampler(args.accounts, args.skew, args.zipf_s)
+    out = []
+    start = time.perf_counter() + 0.05
+    stop = start + args.duration
+    threads = [threading.Thread(target=_worker, args=(target, args, pick, args.seed + i, start, stop, out))
+               for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    target.close()
+
+    counts = {"ok": 0, "declined": 0, "error": 0}
+    latencies = []
+    for c, lat in out:
+        for k in counts:
+            counts[k] += c[k]
+        latencies.extend(lat)
+    latencies.sort()
+    total = sum(counts.values())
+    ms = lambda v: None if v is None else round(v * 1000, 3)
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "seconds": round(elapsed, 3),
+        "requests": total,
+        "ok": counts["ok"],
+        "declined": counts["declined"],
+        "errors": counts["error"],
+        "target_tps": args.tps or None,
+        "throughput_tps": round(total / elapsed, 1),
+        "ok_tps": round(counts["ok"] / elapsed, 1),
+        "decline_rate": round(counts["declined"] / total, 4) if total else None,
+        "error_rate": round(counts["error"] / total, 4) if total else None,
+        "latency_ms": {"p50": ms(percentile(latencies, 50)), "p95": ms(percentile(latencies, 95)),
+                       "p99": ms(percentile(latencies, 99)), "max": ms(latencies[-1] if latencies else None)},
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate transfer load against BankSC.")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="inproc")
+    parser.add_argument("--url", default="http://localhost:5000", help="Run.py server for --target http")
+    parser.add_argument("--no-setup", dest="setup", action="store_false",
+                        help="http: accounts already exist, do not create them")
+    parser.add_argument("--tps", type=float, default=0, help="target transfers/sec (0 = as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--accounts", type=int, default=10_000)
+    parser.add_argument("--balance", type=int, default=1_000, help="initial balance per account")
+    parser.add_argument("--skew", choices=("uniform", "zipf"), default="uniform")
+    parser.add_argument("--zipf-s", type=float, default=1.1)
+    parser.add_argument("--min-amount", type=int, default=1)
+    parser.add_argument("--max-amount", type=int, default=100)
+    parser.add_argument("--journal", help="inproc: journal directory (default: in memory only)")
+    parser.add_argument("--sync", default="group", help="inproc: journal sync mode")
+    parser.add_argument("--log", action="store_true", help="inproc: keep per-transfer log lines")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+    return 0 if not report["errors"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
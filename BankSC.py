@@ -1,44 +1,510 @@
 """
 bankSC.py - Bank Simulation Client
 สามารถต่อยอดเชื่อม PSP/ธนาคารจริง
+Thread-safe: บัญชีถูกล็อกแบบ striped lock, การโอนล็อกตามลำดับเสมอ (ไม่เกิด deadlock)
+Compact: ข้อมูลบัญชีเก็บเป็นคอลัมน์ใน AccountStore (array), BankAccount เป็นเพียง view
+Durable (optional): BankSystem(journal=Journal(...)) จาก bankJournal.py
 """
 
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import ExitStack
+from operator import index
+
+import LogSC
+
+# Per-transfer lines are formatted on the log writer thread; set the
+# BANKSC level to "warning" (LogSC.configure) to skip them entirely.
+_log = LogSC.get_logger("BANKSC")
+
 class Common:
     @staticmethod
     def log(msg):
-        print(f"[BANKSC] {msg}")
+        _log.info(msg)
+
+# Changes are appended to the journal while the account locks that ordered
+# them are held, and committed (waited on) after they are released.
+def _journal(journal, op, deltas, key=None):
+    if journal is None:
+        return None
+    record = {"op": op, "deltas": deltas}
+    if key is not None:
+        record["key"] = key
+    return journal.append(record)
+
+def _commit(journal, seq):
+    if seq is not None:
+        journal.commit(seq)
+
+# Listeners get (op, {name: (delta, new balance)}) while the locks are
+# still held, so events for one account arrive in order. They must be
+# quick (e.g. enqueue) and must not call back into the bank.
+def _notify(store, op, changes):
+    for listener in store.listeners:
+        listener(op, changes)
+
+# -------------------------
+# Account Store
+# -------------------------
+# Balances are stored as 64-bit ints. Every new balance is range-checked
+# before any column changes, so an out-of-range value raises OverflowError
+# and leaves the store (and the journal) as it was.
+MIN_BALANCE, MAX_BALANCE = -2**63, 2**63 - 1
+
+def _check_balance(name, balance):
+    if not MIN_BALANCE <= balance <= MAX_BALANCE:
+        raise OverflowError(f"Balance of {name} out of range: {balance}")
+    return balance
+
+class AccountStore:
+    """Column-oriented accounts: row ``id`` is names[id], countries[id]
+    (an index into country_names) and balances[id].
+
+    Names and countries are interned, balances are a contiguous
+    ``array('q')``, and rows share ``stripes`` locks (row id modulo
+    stripes) instead of one lock per account. Rows are never removed;
+    adding a name again points it at a new row (BankSystem refuses to,
+    but replaying an older journal may).
+    """
+
+    def __init__(self, stripes=256):
+        self.names = []
+        self.countries = array("H")
+        self.country_names = []
+        self.balances = array("q")
+        self.index = {}           # name -> live row id
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.journal = None
+        self.listeners = ()
+        self._country_codes = {}
+        self._lock = threading.Lock()  # row appends
+
+    def __len__(self):
+        return len(self.index)
+
+    def _country(self, country):
+        code = self._country_codes.get(country)
+        if code is None:
+            code = self._country_codes[country] = len(self.country_names)
+            self.country_names.append(country)
+        return code
+
+    def check(self, rows):
+        """Validated (country, name, balance) rows; raises before anything is stored."""
+        checked, new_countries = [], set()
+        for country, name, balance in rows:
+            if not isinstance(country, str):
+                raise TypeError(f"Country of {name} must be a string: {country!r}")
+            country = sys.intern(country)
+            if country not in self._country_codes:
+                new_countries.add(country)
+            checked.append((country, sys.intern(name), _check_balance(name, index(balance))))
+        # Country codes are stored in array("H").
+        if len(self.country_names) + len(new_countries) > 0x10000:
+            raise OverflowError(f"Too many countries: {len(self.country_names) + len(new_countries)}")
+        return checked
+
+    def add_many(self, rows):
+        """Append (country, name, balance) rows; returns the range of new ids.
+
+        Rows are checked first, so a bad row leaves every column unchanged.
+        """
+        with self._lock:
+            rows = self.check(rows)
+            start = len(self.names)
+            for country, name, balance in rows:
+                self.countries.append(self._country(country))
+                self.balances.append(balance)
+                self.names.append(name)
+                self.index[name] = len(self.names) - 1
+            return range(start, len(self.names))
+
+    def add(self, country, name, balance=0):
+        return self.add_many([(country, name, balance)])[0]
+
+    def lock(self, row):
+        return self.locks[row % len(self.locks)]
+
+    def rows(self):
+        """[(name, country, balance)] for every live account."""
+        names, countries, balances = self.country_names, self.countries, self.balances
+        return [(name, names[countries[row]], balances[row]) for name, row in list(self.index.items())]
 
 class BankAccount:
-    def __init__(self, country, name, balance=0):
-        self.country = country
-        self.name = name
-        self.balance = balance
-        Common.log(f"Account created: {self.name} ({self.country}) balance={self.balance}")
+    """View of one AccountStore row.
+
+    ``BankAccount(country, name, balance)`` still works and creates a
+    standalone account in its own single-row store.
+    """
+    __slots__ = ("store", "id")
+
+    def __init__(self, country, name, balance=0, quiet=False, store=None):
+        self.store = AccountStore(stripes=1) if store is None else store
+        self.id = self.store.add(country, name, balance)
+        if not quiet:
+            _log.info("Account created: %s (%s) balance=%s", name, country, balance)
+
+    @classmethod
+    def view(cls, store, row):
+        acc = cls.__new__(cls)
+        acc.store = store
+        acc.id = row
+        return acc
+
+    @property
+    def name(self):
+        return self.store.names[self.id]
+
+    @property
+    def country(self):
+        return self.store.country_names[self.store.countries[self.id]]
+
+    @property
+    def balance(self):
+        return self.store.balances[self.id]
+
+    @balance.setter
+    def balance(self, value):
+        self.store.balances[self.id] = value
+
+    @property
+    def lock(self):
+        return self.store.lock(self.id)
+
+    @property
+    def journal(self):
+        return self.store.journal
+
+    def __eq__(self, other):
+        return isinstance(other, BankAccount) and self.store is other.store and self.id == other.id
+
+    def __hash__(self):
+        return hash((id(self.store), self.id))
+
+    def __repr__(self):
+        return f"BankAccount({self.country!r}, {self.name!r}, balance={self.balance})"
 
     def deposit(self, amount):
-        self.balance += amount
-        Common.log(f"Deposit {amount} -> {self.name} new balance={self.balance}")
+        with self.lock:
+            self.balance += amount
+            balance = self.balance
+            seq = _journal(self.journal, "deposit", {self.name: amount})
+            if self.store.listeners:
+                _notify(self.store, "deposit", {self.name: (amount, balance)})
+        _commit(self.journal, seq)
+        _log.info("Deposit %s -> %s new balance=%s", amount, self.name, balance)
 
     def withdraw(self, amount):
-        if amount <= self.balance:
-            self.balance -= amount
-            Common.log(f"Withdraw {amount} -> {self.name} new balance={self.balance}")
+        # Check and debit under one lock, so two withdrawals cannot both
+        # pass the check against the same balance.
+        with self.lock:
+            ok = amount <= self.balance
+            seq = None
+            if ok:
+                self.balance -= amount
+                seq = _journal(self.journal, "withdraw", {self.name: -amount})
+            balance = self.balance
+            if ok and self.store.listeners:
+                _notify(self.store, "withdraw", {self.name: (-amount, balance)})
+        if ok:
+            _commit(self.journal, seq)
+            _log.info("Withdraw %s -> %s new balance=%s", amount, self.name, balance)
             return True
-        Common.log(f"Withdraw failed: insufficient funds in {self.name}")
+        _log.info("Withdraw failed: insufficient funds in %s", self.name)
         return False
 
+def acquire(locks):
+    """Hold each distinct lock in ``locks`` once, in one global order (by object id)."""
+    stack = ExitStack()
+    for _, lock in sorted({id(lock): lock for lock in locks}.items()):
+        stack.enter_context(lock)
+    return stack
+
+def locked(*accounts):
+    """Hold the locks of ``accounts``; accounts sharing a stripe share its lock."""
+    return acquire(acc.lock for acc in accounts)
+
+# -------------------------
+# Idempotency Keys
+# -------------------------
+class IdempotencyCache:
+    """Bounded LRU of idempotency key -> result (True applied, False declined).
+
+    ``begin(key)`` returns the cached result, or None when the caller now
+    owns the key and must ``finish`` (or ``abort``) it; a concurrent
+    request with the same key waits for the owner instead of repeating
+    the work. The oldest keys are forgotten beyond ``capacity``.
+    """
+
+    def __init__(self, capacity=100_000):
+        self.capacity = capacity
+        self._done = OrderedDict()
+        self._inflight = {}  # key -> Event set when the owner finishes
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._done)
+
+    def begin(self, key):
+        while True:
+            with self._lock:
+                result = self._done.get(key)
+                if result is not None:
+                    self._done.move_to_end(key)
+                    return result
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    return None
+            event.wait()
+
+    def record(self, key, result):
+        with self._lock:
+            self._done[key] = result
+            self._done.move_to_end(key)
+            while len(self._done) > self.capacity:
+                self._done.popitem(last=False)
+
+    def finish(self, key, result):
+        self.record(key, result)
+        self.abort(key)
+
+    def abort(self, key):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def applied(self):
+        """Keys of applied transfers, oldest first (declines are not durable)."""
+        with self._lock:
+            return [key for key, result in self._done.items() if result]
+
+class AccountsView(Mapping):
+    """Read-only name -> BankAccount mapping over an AccountStore."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, name):
+        return BankAccount.view(self.store, self.store.index[name])
+
+    def __contains__(self, name):
+        return name in self.store.index
+
+    def __iter__(self):
+        return iter(list(self.store.index))
+
+    def __len__(self):
+        return len(self.store.index)
+
+# -------------------------
+# Bank System
+# -------------------------
 class BankSystem:
-    def __init__(self):
-        self.accounts = {}
+    """Accounts plus transfers; with a ``journal`` its state is recovered
+    from the journal on construction and every change is journaled.
+
+    The keys of the last ``dedup_size`` keyed transfers (``transfer_once``)
+    are remembered; applied ones are journaled with their transfer, so
+    they survive a restart too.
+    """
+
+    def __init__(self, journal=None, stripes=256, dedup_size=100_000):
+        self.store = AccountStore(stripes)
+        self.accounts = AccountsView(self.store)
+        self.dedup = IdempotencyCache(dedup_size)
+        # Guards account creation; balances are guarded by the store's stripes.
+        self._lock = threading.Lock()
+        self.journal = None
+        if journal is not None:
+            replayed = journal.recover(self._replay)
+            _log.info("Recovered %s accounts, replayed %s journal records", len(self.accounts), replayed)
+            self.journal = self.store.journal = journal
+            journal.start(self._checkpoint)
+
+    def _replay(self, record):
+        if record["op"] == "create":
+            self.store.add(record["country"], record["name"], record["balance"])
+        elif record["op"] == "create_many":
+            self.store.add_many((country, name, balance) for name, country, balance in record["accounts"])
+        elif record["op"] == "keys":
+            for key in record["keys"]:
+                self.dedup.record(key, True)
+        else:
+            balances, index = self.store.balances, self.store.index
+            for name, delta in record["deltas"].items():
+                balances[index[name]] += delta
+            if "key" in record:
+                self.dedup.record(record["key"], True)
+
+    def _checkpoint(self):
+        # Holding every lock blocks all writers, so the balances read here
+        # are exactly the state after the last journaled seq.
+        with self._lock, acquire(self.store.locks):
+            seq = self.journal.rotate()
+            state = self.store.rows()
+            keys = self.dedup.applied()
+        self.journal.write_snapshot(seq, state, keys)
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def add_listener(self, listener):
+        """Call ``listener(op, {name: (delta, balance)})`` on every balance change."""
+        with self._lock:
+            self.store.listeners = self.store.listeners + (listener,)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            self.store.listeners = tuple(l for l in self.store.listeners if l is not listener)
+
+    def _check_new(self, rows):
+        # The journal records balance changes by name, but a BankAccount is
+        # bound to a row: re-creating a name would leave existing views
+        # changing an orphaned row that replay then credits to the new one.
+        # So names are never re-used. Call with self._lock held.
+        rows = self.store.check(rows)
+        seen = set()
+        for _, name, _ in rows:
+            if name in self.store.index or name in seen:
+                raise ValueError(f"Account already exists: {name}")
+            seen.add(name)
+        return rows
 
     def create_account(self, country, name, balance=0):
-        acc = BankAccount(country, name, balance)
-        self.accounts[name] = acc
+        """Create one account; ValueError if ``name`` already exists."""
+        with self._lock:
+            self._check_new([(country, name, balance)])
+            acc = BankAccount(country, name, balance, store=self.store)
+            seq = None if self.journal is None else self.journal.append(
+                {"op": "create", "name": name, "country": country, "balance": balance})
+            if self.store.listeners:
+                _notify(self.store, "create", {name: (balance, balance)})
+        _commit(self.journal, seq)
         return acc
 
-    def transfer(self, from_acc, to_acc, amount):
-        if from_acc.withdraw(amount):
-            to_acc.deposit(amount)
-            Common.log(f"Transfer {amount} from {from_acc.name} to {to_acc.name} complete.")
-            return True
-        return False
+    def create_accounts(self, rows):
+        """Bulk-create (country, name, balance) rows with one log line; returns the count.
+
+        All or nothing: ValueError if any name already exists or repeats.
+        """
+        with self._lock:
+            # Checked under the lock, so no other create can take a name or
+            # use up the country codes between this check and add_many.
+            rows = self._check_new(rows)
+            self.store.add_many(rows)
+            seq = None if self.journal is None else self.journal.append(
+                {"op": "create_many", "accounts": [[name, country, balance] for country, name, balance in rows]})
+            if self.store.listeners:
+                _notify(self.store, "create", {name: (balance, balance) for _, name, balance in rows})
+        _commit(self.journal, seq)
+        _log.info("Accounts created: %s", len(rows))
+        return len(rows)
+
+    def transfer(self, from_acc, to_acc, amount, key=None):
+        # A negative amount would pass the funds check and move money the
+        # other way, so it is an error rather than a transfer.
+        if amount < 0:
+            raise ValueError(f"Transfer amount must not be negative: {amount}")
+        # Both balances change under both locks: no other transfer can see
+        # the money debited but not yet credited.
+        with locked(from_acc, to_acc):
+            ok = amount <= from_acc.balance
+            seq = None
+            if ok:
+                from_balance = from_acc.balance - amount
+                to_balance = (from_balance if from_acc == to_acc else to_acc.balance) + amount
+                _check_balance(to_acc.name, to_balance)
+                from_acc.balance = from_balance
+                to_acc.balance = to_balance
+                deltas = {from_acc.name: -amount}
+                deltas[to_acc.name] = deltas.get(to_acc.name, 0) + amount
+                seq = _journal(self.journal, "transfer", deltas, key)
+                if key is not None:
+                    # Under the locks, so a checkpoint sees the key with its balances.
+                    self.dedup.record(key, True)
+            from_balance, to_balance = from_acc.balance, to_acc.balance
+            if ok and self.store.listeners:
+                _notify(self.store, "transfer", {from_acc.name: (deltas[from_acc.name], from_balance),
+                                                 to_acc.name: (deltas[to_acc.name], to_balance)})
+        _commit(self.journal, seq)
+        if not ok:
+            if _log.level <= LogSC.INFO:
+                _log.info("Withdraw failed: insufficient funds in %s", from_acc.name)
+            return False
+        if _log.level <= LogSC.INFO:
+            from_name, to_name = from_acc.name, to_acc.name
+            _log.info("Withdraw %s -> %s new balance=%s", amount, from_name, from_balance)
+            _log.info("Deposit %s -> %s new balance=%s", amount, to_name, to_balance)
+            _log.info("Transfer %s from %s to %s complete.", amount, from_name, to_name)
+        return True
+
+    def transfer_once(self, key, from_acc, to_acc, amount):
+        """Transfer at most once per ``key``; returns (success, duplicate).
+
+        A repeated key returns the first attempt's result without
+        transferring again. Accounts may be names (KeyError if unknown);
+        errors leave the key unused, so a corrected retry can use it.
+        """
+        result = self.dedup.begin(key)
+        if result is not None:
+            return result, True
+        try:
+            from_acc, to_acc = self._resolve(from_acc), self._resolve(to_acc)
+            ok = self.transfer(from_acc, to_acc, amount, key)
+        except BaseException:
+            self.dedup.abort(key)
+            raise
+        self.dedup.finish(key, ok)
+        return ok, False
+
+    def _resolve(self, acc):
+        return acc if isinstance(acc, BankAccount) else self.accounts[acc]
+
+    def settle_batch(self, transfers):
+        """Settle (from, to, amount) transfers as one all-or-nothing batch.
+
+        Accounts may be given as BankAccount objects or names (KeyError if
+        unknown). Transfers are netted per account first, so only the net
+        positions must be covered: a batch can succeed where applying the
+        same transfers one at a time would fail part-way.
+        """
+        net, accounts, gross, count = {}, {}, 0, 0
+        for from_acc, to_acc, amount in transfers:
+            from_acc, to_acc = self._resolve(from_acc), self._resolve(to_acc)
+            if amount < 0:
+                raise ValueError(f"Transfer amount must not be negative: {amount}")
+            accounts[from_acc.id] = from_acc
+            accounts[to_acc.id] = to_acc
+            net[from_acc.id] = net.get(from_acc.id, 0) - amount
+            net[to_acc.id] = net.get(to_acc.id, 0) + amount
+            gross += amount
+            count += 1
+        with locked(*accounts.values()):
+            balances = {i: accounts[i].balance + delta for i, delta in net.items() if delta}
+            short = [accounts[i].name for i, balance in balances.items() if balance < 0]
+            seq = None
+            if not short:
+                for i, balance in balances.items():
+                    _check_balance(accounts[i].name, balance)
+                for i, balance in balances.items():
+                    accounts[i].balance = balance
+                seq = _journal(self.journal, "batch",
+                               {accounts[i].name: delta for i, delta in net.items() if delta})
+                if self.store.listeners:
+                    _notify(self.store, "batch", {accounts[i].name: (delta, accounts[i].balance)
+                                                  for i, delta in net.items() if delta})
+        _commit(self.journal, seq)
+        settled = sum(delta for delta in net.values() if delta > 0)
+        result = {"success": not short, "transfers": count, "accounts": len(accounts),
+                  "gross": gross, "net": settled, "insufficient": short}
+        if short:
+            _log.info("Batch of %s transfers rejected: insufficient funds in %s", count, ", ".join(short))
+        else:
+            _log.info("Batch of %s transfers settled: gross=%s net=%s accounts=%s", count, gross, settled, len(accounts))
+        return result
@@ -5,15 +5,18 @@ comSC - Client สำหรับเชื่อมต่อ server และ Sc
 
 import time
 import threading
-import requests
+import NetSC
+import LogSC
 
 # -------------------------
 # Common Helpers
 # -------------------------
+_log = LogSC.get_logger("LOG")
+
 class Common:
     @staticmethod
     def log(message):
-        print(f"[LOG] {message}")
+        _log.info(message)
 
 # -------------------------
 # Scanzaclip Module
@@ -66,19 +69,19 @@ class ServerClient:
     def send_heartbeat(self):
         while self.running:
             try:
-                requests.post(f"{SERVER_URL}/heartbeat", json={"client_id": self.client_id})
+                NetSC.post(f"{SERVER_URL}/heartbeat", json={"client_id": self.client_id}, retries=1)
                 Common.log("Heartbeat sent")
             except Exception as e:
-                Common.log(f"Heartbeat error: {e}")
+                _log.error("Heartbeat error: %s", e)
             time.sleep(10)
 
     def fetch_task(self):
         try:
-            response = requests.get(f"{SERVER_URL}/get_task?client_id={self.client_id}")
+            response = NetSC.get(f"{SERVER_URL}/get_task", params={"client_id": self.client_id})
             if response.status_code == 200 and response.json().get("task"):
                 return response.json()["task"]
         except Exception as e:
-            Common.log(f"Fetch task error: {e}")
+            _log.error("Fetch task error: %s", e)
         return None
 
 # -------------------------
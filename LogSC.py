@@ -0,0 +1,197 @@
+"""
+logSC - Shared asynchronous logger for every ProSC module
+Levels and sampling, a bounded ring buffer drained by one background
+writer thread, plain "[NAME] message" or JSON-lines output
+"""
+
+import atexit
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+
+# -------------------------
+# Levels
+# -------------------------
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {v: k for k, v in LEVELS.items()}
+
+def _level(value):
+    return LEVELS[value.lower()] if isinstance(value, str) else int(value)
+
+# -------------------------
+# Writer
+# -------------------------
+class Writer:
+    """Ring buffer of records written out by a daemon thread.
+
+    Callers only append to a deque; formatting (including %-style
+    ``args``) and I/O happen on the writer thread. When more than
+    ``capacity`` records are waiting the oldest are dropped and counted.
+    """
+
+    def __init__(self, stream=None, fmt="text", capacity=10_000, flush_interval=0.2):
+        if fmt not in ("text", "json"):
+            raise ValueError(f"Unknown log format: {fmt}")
+        self.stream = stream
+        self.fmt = fmt
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._buffer = deque(maxlen=capacity)
+        self._wake = threading.Event()
+        self._io_lock = threading.Lock()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def put(self, record):
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            self.dropped += 1
+        was_empty = not buffer
+        buffer.append(record)
+        if self._thread is None:
+            self._start()
+        if was_empty:
+            self._wake.set()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="prosc-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _format(self, record):
+        created, level, name, msg, args, fields = record
+        if args:
+            try:
+                msg = msg % args
+            except (TypeError, ValueError):
+                msg = f"{msg} {args}"
+        if self.fmt == "json":
+            entry = {"ts": round(created, 6), "level": LEVEL_NAMES.get(level, level), "logger": name, "msg": str(msg)}
+            entry.update(fields)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+        if fields:
+            msg = f"{msg} " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return f"[{name}] {msg}"
+
+    def flush(self):
+        """Write out everything buffered so far (also safe to call from any thread)."""
+        with self._io_lock:
+            buffer, lines = self._buffer, []
+            while buffer:
+                try:
+                    lines.append(self._format(buffer.popleft()))
+                except IndexError:
+                    break
+            if self.dropped:
+                lines.append(self._format((time.time(), WARNING, "LOG", "Dropped %s log records (buffer full)",
+                                           (self.dropped,), {})))
+                self.dropped = 0
+            if lines:
+                stream = self.stream or sys.stdout
+                try:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except (OSError, ValueError):
+                    pass  # closed stream at shutdown
+
+# -------------------------
+# Loggers
+# -------------------------
+class Logger:
+    """Named logger; records below ``level`` cost one comparison.
+
+    ``sample`` (0..1) keeps that fraction of DEBUG/INFO records;
+    WARNING and ERROR are never sampled away.
+    """
+
+    def __init__(self, name, writer, level=INFO, sample=1.0):
+        self.name = name
+        self.writer = writer
+        self.level = level
+        self.sample = sample
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, msg, *args, **fields):
+        if level < self.level:
+            return
+        if level < WARNING and self.sample < 1.0 and random.random() >= self.sample:
+            return
+        self.writer.put((time.time(), level, self.name, msg, args, fields))
+
+    def debug(self, msg, *args, **fields):
+        if DEBUG >= self.level:
+            self.log(DEBUG, msg, *args, **fields)
+
+    def info(self, msg, *args, **fields):
+        if INFO >= self.level:
+            self.log(INFO, msg, *args, **fields)
+
+    def warning(self, msg, *args, **fields):
+        if WARNING >= self.level:
+            self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg, *args, **fields):
+        if ERROR >= self.level:
+            self.log(ERROR, msg, *args, **fields)
+
+# -------------------------
+# Shared Configuration
+# -------------------------
+# Defaults come from the environment: PROSC_LOG_LEVEL, PROSC_LOG_FORMAT
+# (text/json), PROSC_LOG_SAMPLE and PROSC_LOG_BUFFER.
+_writer = Writer(fmt=os.environ.get("PROSC_LOG_FORMAT", "text"),
+                 capacity=int(os.environ.get("PROSC_LOG_BUFFER", 10_000)))
+_defaults = {"level": _level(os.environ.get("PROSC_LOG_LEVEL", "info")),
+             "sample": float(os.environ.get("PROSC_LOG_SAMPLE", 1.0))}
+_overrides = {}  # logger name -> {"level": ..., "sample": ...}
+_loggers = {}
+_lock = threading.Lock()
+atexit.register(_writer.flush)
+
+def get_logger(name):
+    with _lock:
+        logger = _loggers.get(name)
+        if logger is None:
+            settings = dict(_defaults, **_overrides.get(name, {}))
+            logger = _loggers[name] = Logger(name, _writer, settings["level"], settings["sample"])
+        return logger
+
+def configure(level=None, sample=None, fmt=None, stream=None, loggers=None):
+    """Change settings for all loggers; ``loggers`` maps a name to {"level", "sample"} overrides."""
+    with _lock:
+        if level is not None:
+            _defaults["level"] = _level(level)
+        if sample is not None:
+            _defaults["sample"] = float(sample)
+        for name, settings in (loggers or {}).items():
+            settings = dict(settings)
+            if "level" in settings:
+                settings["level"] = _level(settings["level"])
+            _overrides.setdefault(name, {}).update(settings)
+        if fmt is not None:
+            if fmt not in ("text", "json"):
+                raise ValueError(f"Unknown log format: {fmt}")
+            _writer.fmt = fmt
+        if stream is not None:
+            _writer.stream = stream
+        for name, logger in _loggers.items():
+            settings = dict(_defaults, **_overrides.get(name, {}))
+            logger.level, logger.sample = settings["level"], settings["sample"]
+
+def flush():
+    _writer.flush()
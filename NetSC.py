@@ -0,0 +1,137 @@
+"""
+netSC - Shared HTTP transport for every ProSC client
+Pooled keep-alive sessions per host, default timeouts,
+bounded retries with jittered backoff and connection-reuse stats
+"""
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# -------------------------
+# Transport
+# -------------------------
+DEFAULT_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+class Transport:
+    """One pooled ``requests.Session`` per scheme://host, shared by all callers.
+
+    Idempotent requests are retried up to ``retries`` times on connection
+    errors, timeouts and RETRY_STATUSES, sleeping a random delay of up to
+    ``backoff * 2**attempt`` (capped at ``max_backoff``) between attempts.
+    Other methods are only retried when the caller passes ``retries``.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=2, backoff=0.2, max_backoff=5.0, pool_size=10):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "retries": 0, "errors": 0}
+
+    def session(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}".lower()
+        with self._lock:
+            session = self._sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[origin] = session
+            return session
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def request(self, method, url, retries=None, **kwargs):
+        method = method.upper()
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session(url)
+        for attempt in range(retries + 1):
+            self._count("requests")
+            try:
+                resp = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._count("errors")
+                if attempt == retries:
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                    return resp
+                resp.close()
+            self._count("retries")
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Request/retry/error counts plus new vs reused connections per host."""
+        with self._lock:
+            result = dict(self._counts)
+            sessions = list(self._sessions.items())
+        hosts = {}
+        for origin, session in sessions:
+            connections = requests_sent = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in list(pools.keys()):
+                    pool = pools.get(key)
+                    if pool is not None:
+                        connections += pool.num_connections
+                        requests_sent += pool.num_requests
+            hosts[origin] = {"connections": connections, "requests": requests_sent,
+                             "reused": max(requests_sent - connections, 0)}
+        result["hosts"] = hosts
+        result["connections"] = sum(h["connections"] for h in hosts.values())
+        result["reused"] = sum(h["reused"] for h in hosts.values())
+        return result
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+# -------------------------
+# Shared Default Transport
+# -------------------------
+_default = None
+_default_lock = threading.Lock()
+
+def default_transport():
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Transport()
+        return _default
+
+def request(method, url, **kwargs):
+    return default_transport().request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    return default_transport().get(url, **kwargs)
+
+def post(url, **kwargs):
+    return default_transport().post(url, **kwargs)
+
+def stats():
+    return default_transport().stats()
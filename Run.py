@@ -4,68 +4,155 @@ run.py - BankSC Full Simulation Client + Web Dashboard
 พร้อมเว็บ dashboard
 """
 
+import heapq
+import json
 import threading
 import time
-from flask import Flask, jsonify, render_template_string
+from urllib.parse import urlencode
+from flask import Flask, Response, jsonify, stream_with_context
+
+from BankSC import Common, BankSystem
+from BankJournal import Journal
 
 # -------------------------
-# Common Helper
+# Bank Client Simulation
 # -------------------------
-class Common:
-    @staticmethod
-    def log(msg):
-        print(f"[BANKSC] {msg}")
+# Balances survive restarts: journal + snapshots live in JOURNAL_DIR.
+# JOURNAL_SYNC trades durability for latency (see bankJournal.SYNC_MODES).
+JOURNAL_DIR = "bank_journal"
+JOURNAL_SYNC = "group"
+bank = BankSystem(journal=Journal(JOURNAL_DIR, sync=JOURNAL_SYNC))
+# ตัวอย่างบัญชีเริ่มต้น (สร้างเฉพาะครั้งแรก, ครั้งต่อไปกู้คืนจาก journal)
+acc1 = bank.accounts.get("TH_Account1") or bank.create_account("Thailand", "TH_Account1", 1000)
+acc2 = bank.accounts.get("US_Account1") or bank.create_account("USA", "US_Account1", 500)
 
 # -------------------------
-# Bank Simulation
+# Web Dashboard
 # -------------------------
-class BankAccount:
-    def __init__(self, country, name, balance=0):
-        self.country = country
-        self.name = name
-        self.balance = balance
-        Common.log(f"Account created: {self.name} ({self.country}) balance={self.balance}")
-
-    def deposit(self, amount):
-        self.balance += amount
-        Common.log(f"Deposit {amount} -> {self.name} new balance={self.balance}")
-
-    def withdraw(self, amount):
-        if amount <= self.balance:
-            self.balance -= amount
-            Common.log(f"Withdraw {amount} -> {self.name} new balance={self.balance}")
-            return True
-        Common.log(f"Withdraw failed: insufficient funds in {self.name}")
-        return False
-
-class BankSystem:
+app = Flask(__name__)
+
+# The page renders one sorted page of accounts from a pre-compiled
+# template; the summary is kept up to date from bank change events rather
+# than recomputed per request, and open pages get balance changes pushed
+# over /events (server-sent events) instead of reloading.
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+SORT_KEYS = ("name", "country", "balance")
+PUSH_INTERVAL = 0.5      # seconds between pushes to one client
+MAX_PUSH_CHANGES = 5000  # more pending changes than this: client reloads instead
+
+class DashboardSummary:
+    """Account count and balance totals, overall and per country, updated incrementally."""
+
+    def __init__(self, bank):
+        self.store = bank.store
+        self._lock = threading.Lock()
+        self.count, self.total, self.by_country = 0, 0, {}
+        for _, country, balance in bank.store.rows():
+            self.count += 1
+            self.total += balance
+            self.by_country[country] = self.by_country.get(country, 0) + balance
+        bank.add_listener(self.on_change)
+
+    def on_change(self, op, changes):
+        store = self.store
+        with self._lock:
+            if op == "create":
+                self.count += len(changes)
+            for name, (delta, _) in changes.items():
+                country = store.country_names[store.countries[store.index[name]]]
+                self.total += delta
+                self.by_country[country] = self.by_country.get(country, 0) + delta
+
+    def snapshot(self):
+        with self._lock:
+            return {"accounts": self.count, "total": self.total, "by_country": dict(self.by_country)}
+
+class _Subscriber:
+    __slots__ = ("pending", "overflow", "cond")
+
     def __init__(self):
-        self.accounts = {}
+        self.pending = {}  # name -> latest balance
+        self.overflow = False
+        self.cond = threading.Condition()
 
-    def create_account(self, country, name, balance=0):
-        acc = BankAccount(country, name, balance)
-        self.accounts[name] = acc
-        return acc
+class Broadcaster:
+    """Coalesces balance changes per connected dashboard."""
 
-    def transfer(self, from_acc, to_acc, amount):
-        if from_acc.withdraw(amount):
-            to_acc.deposit(amount)
-            Common.log(f"Transfer {amount} from {from_acc.name} to {to_acc.name} complete.")
-            return True
-        return False
+    def __init__(self, bank):
+        self._subs = ()
+        self._lock = threading.Lock()
+        bank.add_listener(self.publish)
 
-# -------------------------
-# Bank Client Simulation
-# -------------------------
-bank = BankSystem()
-# ตัวอย่างบัญชีเริ่มต้น
-acc1 = bank.create_account("Thailand", "TH_Account1", 1000)
-acc2 = bank.create_account("USA", "US_Account1", 500)
+    def subscribe(self):
+        sub = _Subscriber()
+        with self._lock:
+            self._subs = self._subs + (sub,)
+        return sub
 
-# -------------------------
-# Web Dashboard
-# -------------------------
-app = Flask(__name__)
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def publish(self, op, changes):
+        for sub in self._subs:
+            with sub.cond:
+                if not sub.overflow:
+                    for name, (_, balance) in changes.items():
+                        sub.pending[name] = balance
+                    if len(sub.pending) > MAX_PUSH_CHANGES:
+                        sub.overflow = True
+                        sub.pending = {}
+                sub.cond.notify()
+
+    def wait(self, sub, timeout):
+        """Next (changes, overflow) for ``sub``, or None if nothing changed within ``timeout``."""
+        with sub.cond:
+            if not sub.cond.wait_for(lambda: sub.pending or sub.overflow, timeout):
+                return None
+        time.sleep(PUSH_INTERVAL)  # let more changes join this push
+        with sub.cond:
+            changes, overflow = sub.pending, sub.overflow
+            sub.pending, sub.overflow = {}, False
+        return changes, overflow
+
+dashboard = DashboardSummary(bank)
+broadcaster = Broadcaster(bank)
+_order_cache = {}  # sort key -> (rows in store when built, sorted names)
+
+def _sorted_names(sort):
+    # Name and country order only change when accounts are created.
+    store = bank.store
+    built = len(store.names)
+    cached = _order_cache.get(sort)
+    if cached is None or cached[0] != built:
+        names = list(store.index)
+        if sort == "country":
+            names.sort(key=lambda n: (store.country_names[store.countries[store.index[n]]], n))
+        else:
+            names.sort()
+        cached = _order_cache[sort] = (built, names)
+    return cached[1]
+
+def account_page(sort="name", desc=False, page=1, per_page=PAGE_SIZE):
+    """[(name, country, balance)] for one page of accounts in the given order."""
+    store = bank.store
+    start = (page - 1) * per_page
+    if sort == "balance":
+        # Balances change constantly, so select just the rows up to this page.
+        balances = store.balances
+        pick = heapq.nlargest if desc else heapq.nsmallest
+        names = [name for name, _ in pick(start + per_page, list(store.index.items()),
+                                          key=lambda item: balances[item[1]])[start:]]
+    else:
+        ordered = _sorted_names(sort)
+        stop = min(start + per_page, len(ordered))
+        names = [ordered[-1 - i] for i in range(start, stop)] if desc else ordered[start:stop]
+    rows = []
+    for name in names:
+        row = store.index[name]
+        rows.append((name, store.country_names[store.countries[row]], store.balances[row]))
+    return rows
 
 INDEX_HTML = """
 <!DOCTYPE html>
@@ -75,12 +162,30 @@ INDEX_HTML = """
 </head>
 <body>
 <h1>BankSC Accounts Dashboard</h1>
+<p>Accounts: <span id="sum-accounts">{{summary.accounts}}</span>,
+   total balance: <span id="sum-total">{{summary.total}}</span></p>
 <ul>
-    {% for name, balance in accounts.items() %}
-        <li>{{name}} ({{countries[name]}}): {{balance}}</li>
+    {% for country, total in summary.by_country|dictsort %}
+        <li>{{country}}: <span data-country="{{country}}">{{total}}</span></li>
     {% endfor %}
 </ul>
 
+<p>Sort by:
+    {% for key in sort_keys %}
+        <a href="{{link(sort=key, order='desc' if key == sort and order == 'asc' else 'asc', page=1)}}">{{key}}</a>
+    {% endfor %}
+</p>
+<ul>
+    {% for name, country, balance in rows %}
+        <li>{{name}} ({{country}}): <span data-account="{{name}}">{{balance}}</span></li>
+    {% endfor %}
+</ul>
+<p>
+    {% if page > 1 %}<a href="{{link(page=page - 1)}}">&laquo; Prev</a>{% endif %}
+    Page {{page}} / {{pages}}
+    {% if page < pages %}<a href="{{link(page=page + 1)}}">Next &raquo;</a>{% endif %}
+</p>
+
 <h2>Transfer Money</h2>
 <form action="/transfer" method="get">
     From: <input type="text" name="from_acc"><br>
@@ -88,15 +193,67 @@ INDEX_HTML = """
     Amount: <input type="number" name="amount"><br>
     <input type="submit" value="Transfer">
 </form>
+<script>
+const events = new EventSource("/events");
+events.onmessage = (event) => {
+    const data = JSON.parse(event.data);
+    if (data.reload) { location.reload(); return; }
+    for (const [name, balance] of Object.entries(data.balances)) {
+        const el = document.querySelector(`[data-account="${CSS.escape(name)}"]`);
+        if (el) el.textContent = balance;
+    }
+    document.getElementById("sum-accounts").textContent = data.summary.accounts;
+    document.getElementById("sum-total").textContent = data.summary.total;
+    for (const [country, total] of Object.entries(data.summary.by_country)) {
+        const el = document.querySelector(`[data-country="${CSS.escape(country)}"]`);
+        if (el) el.textContent = total;
+    }
+};
+</script>
 </body>
 </html>
 """
+INDEX_TEMPLATE = app.jinja_env.from_string(INDEX_HTML)
 
 @app.route("/")
 def index():
-    accounts = {name: acc.balance for name, acc in bank.accounts.items()}
-    countries = {name: acc.country for name, acc in bank.accounts.items()}
-    return render_template_string(INDEX_HTML, accounts=accounts, countries=countries)
+    from flask import request
+    sort = request.args.get("sort", "name")
+    if sort not in SORT_KEYS:
+        sort = "name"
+    order = "desc" if request.args.get("order") == "desc" else "asc"
+    per_page = min(max(request.args.get("per_page", PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    summary = dashboard.snapshot()
+    pages = max(1, -(-summary["accounts"] // per_page))
+    page = min(max(request.args.get("page", 1, type=int), 1), pages)
+
+    def link(**changes):
+        args = {"sort": sort, "order": order, "page": page, "per_page": per_page}
+        args.update(changes)
+        return "/?" + urlencode(args)
+
+    return INDEX_TEMPLATE.render(rows=account_page(sort, order == "desc", page, per_page), summary=summary,
+                                 sort=sort, order=order, page=page, pages=pages, sort_keys=SORT_KEYS, link=link)
+
+@app.route("/events")
+def events():
+    sub = broadcaster.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                update = broadcaster.wait(sub, timeout=15)
+                if update is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                changes, overflow = update
+                payload = {"reload": True} if overflow else {"balances": changes, "summary": dashboard.snapshot()}
+                yield f"data: {json.dumps(payload)}\n\n"
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.route("/transfer")
 def transfer():
@@ -104,11 +261,114 @@ def transfer():
     from_acc = request.args.get("from_acc")
     to_acc = request.args.get("to_acc")
     amount = int(request.args.get("amount", 0))
+    key = request.args.get("key") or request.headers.get("Idempotency-Key")
     if from_acc in bank.accounts and to_acc in bank.accounts:
-        success = bank.transfer(bank.accounts[from_acc], bank.accounts[to_acc], amount)
+        try:
+            if key:
+                success, duplicate = bank.transfer_once(key, from_acc, to_acc, amount)
+                return jsonify({"success": success, "duplicate": duplicate})
+            success = bank.transfer(bank.accounts[from_acc], bank.accounts[to_acc], amount)
+        except (ValueError, OverflowError) as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         return jsonify({"success": success})
     return jsonify({"success": False, "error": "Account not found"})
 
+@app.route("/transfer/batch", methods=["POST"])
+def transfer_batch():
+    from flask import request
+    body = request.get_json(silent=True)
+    items = body.get("transfers") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        return jsonify({"success": False, "error": "Expected a list of transfers"}), 400
+    try:
+        transfers = [(t["from_acc"], t["to_acc"], int(t.get("amount", 0))) for t in items]
+    except KeyError as e:
+        return jsonify({"success": False, "error": f"Missing field: {e.args[0]}"}), 400
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid transfer: {e}"}), 400
+    try:
+        return jsonify(bank.settle_batch(transfers))
+    except KeyError as e:
+        return jsonify({"success": False, "error": f"Account not found: {e.args[0]}"})
+    except (TypeError, ValueError, OverflowError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+# Each request line is {"key", "from_acc", "to_acc", "amount"}; each
+# response line is {"key", "success", "duplicate"} or {"line", "success":
+# false, "error"} (plus "key" if the line parsed), written as soon as that
+# transfer is done. A final {"done": true, ...} line with the counts tells
+# the client the stream was not cut short.
+# A client that loses the response can resend the whole body: keys already
+# applied (bank.dedup) come back as duplicates without moving money again.
+MAX_LINE = 4096
+
+def _stream_transfer(lineno, line):
+    try:
+        t = json.loads(line)
+        key, from_acc, to_acc = t["key"], t["from_acc"], t["to_acc"]
+        if not isinstance(key, str) or not key:
+            raise ValueError("key must be a non-empty string")
+        if not isinstance(from_acc, str) or not isinstance(to_acc, str):
+            raise ValueError("from_acc and to_acc must be account names")
+        amount = int(t.get("amount", 0))
+    except KeyError as e:
+        return {"line": lineno, "success": False, "error": f"Missing field: {e.args[0]}"}
+    except (TypeError, ValueError) as e:
+        return {"line": lineno, "success": False, "error": f"Invalid transfer: {e}"}
+    try:
+        success, duplicate = bank.transfer_once(key, from_acc, to_acc, amount)
+    except KeyError as e:
+        return {"line": lineno, "key": key, "success": False, "error": f"Account not found: {e.args[0]}"}
+    except (TypeError, ValueError, OverflowError) as e:
+        return {"line": lineno, "key": key, "success": False, "error": str(e)}
+    return {"key": key, "success": success, "duplicate": duplicate}
+
+@app.route("/transfer/stream", methods=["POST"])
+def transfer_stream():
+    from flask import request
+    body = request.stream
+
+    def results():
+        counts = {"ok": 0, "declined": 0, "duplicate": 0, "error": 0}
+        for lineno, line in enumerate(iter(lambda: body.readline(MAX_LINE + 1), b""), 1):
+            if not line.strip():
+                continue
+            if len(line) > MAX_LINE:
+                result = {"line": lineno, "success": False, "error": "Line too long"}
+                while not line.endswith(b"\n") and line:
+                    line = body.readline(MAX_LINE + 1)
+            else:
+                result = _stream_transfer(lineno, line)
+            if "error" in result:
+                counts["error"] += 1
+            elif result["duplicate"]:
+                counts["duplicate"] += 1
+            else:
+                counts["ok" if result["success"] else "declined"] += 1
+            yield json.dumps(result, separators=(",", ":")) + "\n"
+        yield json.dumps(dict(counts, done=True), separators=(",", ":")) + "\n"
+
+    return Response(stream_with_context(results()), mimetype="application/x-ndjson")
+
+@app.route("/accounts", methods=["POST"])
+def create_accounts():
+    from flask import request
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        return jsonify({"success": False, "error": "Expected an account or a list of accounts"}), 400
+    try:
+        rows = [(str(a["country"]), str(a["name"]), int(a.get("balance", 0))) for a in items]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid account: {e}"}), 400
+    try:
+        return jsonify({"success": True, "created": bank.create_accounts(rows)})
+    except OverflowError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+
 def run_web():
     app.run(host="0.0.0.0", port=5000)
 
@@ -135,8 +395,12 @@ def main():
     threading.Thread(target=auto_transactions, daemon=True).start()
 
     # Keep main thread alive
-    while True:
-        time.sleep(5)
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        bank.close()
+        Common.log("BankSC simulation stopped.")
 
 if __name__ == "__main__":
     main()
@@ -1,214 +1,885 @@
 # File: scan.py
-import requests, feedparser, json, threading, queue, time
-from bs4 import BeautifulSoup
+import feedparser, json, threading, queue, time, hashlib, os, itertools, heapq, random
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlsplit
+from html.parser import HTMLParser
+import codecs
+import NetSC
+import LogSC
+from ScanKB import KBStore
+from ScanIndex import InvertedIndex
+from ScanDedup import SimHashIndex, simhash
+from ScanMetrics import Metrics
+
+_log = LogSC.get_logger("SCAN")
 
 # --- Atomic-level mapping ---
 atomic_map = {chr(i): f"A{i}" for i in range(65,91)}
 atomic_map[" "] = "__"
 reverse_map = {v:k for k,v in atomic_map.items()}
 
-def encode_atomic(text):
-    return [atomic_map.get(c.upper(),"??") for c in text]
+# Compact form: one byte per unit holding the character it decodes to
+# ("A".."Z", " ", or "?" for anything atomic_map does not cover), so
+# encoding and decoding are a single bytes.translate/decode call.
+_UNKNOWN = ord("?")
+_BYTE_TABLE = bytes(
+    c - 32 if 97 <= c <= 122 else c if 65 <= c <= 90 or c == 32 else _UNKNOWN
+    for c in range(256)
+)
+_BYTE_UNITS = [atomic_map.get(chr(c), "??") for c in range(256)]
+_UNIT_BYTES = {u: ord(k) for k, u in atomic_map.items()}
+# The only non-ASCII characters whose upper() is a mapped letter.
+_FOLD_TABLE = {0x131: "I", 0x17F: "S"}
 
-def decode_atomic(seq):
-    return "".join([reverse_map.get(u,"?") for u in seq])
+class AtomicSeq:
+    """Atomic units packed into ``bytes``.
 
-# --- Online Scanners ---
-def scan_website(url):
-    try:
-        r = requests.get(url, timeout=5)
-        soup = BeautifulSoup(r.text, "html.parser")
-        return soup.get_text(separator=" ", strip=True)
-    except Exception as e:
-        return f"Error: {e}"
-
-def scan_rss(feed_url):
-    try:
-        feed = feedparser.parse(feed_url)
-        return " ".join([entry.title + " " + entry.summary for entry in feed.entries])
-    except Exception as e:
-        return f"Error: {e}"
+    Behaves like the old list of unit strings ("A65", "__", "??") when
+    indexed, iterated or compared, so existing consumers keep working.
+    """
+    __slots__ = ("data",)
 
-# --- Knowledge Base ---
-KB_FILE = "prosc_kb.json"
-def save_kb(data):
-    with open(KB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-def load_kb():
-    try:
-        with open(KB_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except:
-        return {}
+    def __init__(self, data=b""):
+        self.data = bytes(data)
 
-# --- Streaming Scanner Thread ---
-class StreamingScanner(threading.Thread):
-    def __init__(self, sources, interval=60):
-        super().__init__()
-        self.sources = sources
-        self.interval = interval
-        self.kb = load_kb()
-        self.queue = queue.Queue()
-        self.running = True
+    @classmethod
+    def from_units(cls, units):
+        return cls(bytes([_UNIT_BYTES.get(u, _UNKNOWN) for u in units]))
 
-    def run(self):
-        while self.running:
-            for src in self.sources:
-                if src["type"] == "website":
-                    text = scan_website(src["url"])
-                elif src["type"] == "rss":
-                    text = scan_rss(src["url"])
-                elif src["type"] == "twitter":
-                    text = f"Simulated Twitter: {src['handle']}"
-                elif src["type"] == "discord":
-                    text = f"Simulated Discord: {src['channel']}"
-                elif src["type"] == "telegram":
-                    text = f"Simulated Telegram: {src['chat']}"
-                else:
-                    continue
-                atomic_data = encode_atomic(text)
-                self.kb[src.get("url", src.get("handle", src.get("channel", src.get("chat",""))))] = atomic_data
-                self.queue.put((src, atomic_data))
-            save_kb(self.kb)
-            time.sleep(self.interval)
+    def units(self):
+        return list(self)
 
-    def stop(self):
-        self.running = False
+    def text(self):
+        return self.data.decode("ascii")
 
-    def fetch_latest(self):
-        items = []
-        while not self.queue.empty():
-            items.append(self.queue.get())
-        return items
+    def __len__(self):
+        return len(self.data)
 
-# --- Multi-AI Modules Placeholder ---
-def gpt_module(atomic_data): return [u+"G" for u in atomic_data]
-def deebspeak_module(atomic_data): return [u+"D" for u in atomic_data]
-def gbnai_module(atomic_data): return [u+"N" for u in atomic_data]
+    def __iter__(self):
+        return map(_BYTE_UNITS.__getitem__, self.data)
 
-def merge_atomic(*modules):
-    combined = []
-    max_len = max(len(m) for m in modules)
-    for i in range(max_len):
-        for m in modules:
-            if i < len(m):
-                combined.append(m[i])
-                break
-    return combined
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return AtomicSeq(self.data[i])
+        return _BYTE_UNITS[self.data[i]]
 
-def generate_auto_link(module_name):
-    return f"# Auto-link: {module_name}\nregister_module('{module_name}')\n"
+    def __bytes__(self):
+        return self.data
 
-# --- Example Usage ---
-if __name__ == "__main__":
-    sources = [
-        {"type":"website", "url":"https://example.com"},
-        {"type":"rss", "url":"https://news.google.com/rss"},
-        {"type":"twitter", "handle":"@example"},
-        {"type":"discord", "channel":"#general"},
-        {"type":"telegram", "chat":"@examplechat"}
-    ]
+    def __eq__(self, other):
+        if isinstance(other, AtomicSeq):
+            return self.data == other.data
+        if isinstance(other, (list, tuple)):
+            return len(other) == len(self.data) and list(self) == list(other)
+        return NotImplemented
 
-    scanner = StreamingScanner(sources, interval=300)
-    scanner.start()
-    print("ProSC Full Ultimate Streaming Multi-AI Repo (scan.py) running...")
+    def __hash__(self):
+        return hash(self.data)
 
-    try:
-        while True:
-            time.sleep(10)
-            latest = scanner.fetch_latest()
-            for src, atomic in latest:
-                merged = merge_atomic(gpt_module(atomic), deebspeak_module(atomic), gbnai_module(atomic))
-                decoded_preview = decode_atomic(merged[:100])
-                print(f"[Preview] {src}: {decoded_preview}...")
-                link_code = generate_auto_link("MergedModule")
-                print(f"Generated Auto-Link:\n{link_code}")
-    except KeyboardInterrupt:
-        scanner.stop()
-        print("ProSC Ultimate Streaming Repo (scan.py) stopped.")
-# File: prosc_full_ultimate_streaming.py
+    def __getstate__(self):
+        return self.data
 
-import requests, feedparser, json, threading, queue, time
-from bs4 import BeautifulSoup
+    def __setstate__(self, data):
+        self.data = data
 
-# --- Atomic-level mapping ---
-atomic_map = {chr(i): f"A{i}" for i in range(65,91)}
-atomic_map[" "] = "__"
-reverse_map = {v:k for k,v in atomic_map.items()}
+    def __repr__(self):
+        return f"AtomicSeq({self.text()!r})"
 
 def encode_atomic(text):
-    return [atomic_map.get(c.upper(),"??") for c in text]
+    if not text.isascii():
+        text = text.translate(_FOLD_TABLE)
+    return AtomicSeq(text.encode("ascii", "replace").translate(_BYTE_TABLE))
 
 def decode_atomic(seq):
+    if isinstance(seq, AtomicSeq):
+        return seq.text()
     return "".join([reverse_map.get(u,"?") for u in seq])
 
 # --- Online Scanners ---
+# Pages are read in chunks and their text pulled out by a streaming
+# HTMLParser instead of building a full DOM. Reading stops at
+# MAX_PAGE_BYTES of HTML or MAX_PAGE_CHARS of extracted text, whichever
+# comes first; sources can override either with "max_bytes"/"max_chars".
+MAX_PAGE_BYTES = 2 << 20
+MAX_PAGE_CHARS = 200_000
+CHUNK_BYTES = 64 << 10
+
+class _TextExtractor(HTMLParser):
+    # Same output as BeautifulSoup's get_text(separator=" ", strip=True).
+    _SKIP = {"script", "style", "template"}
+
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.chars = 0
+        self._pending = []
+        self._skip = 0
+
+    @property
+    def full(self):
+        return self.chars >= self.max_chars
+
+    def _emit(self):
+        # Text nodes can arrive in several pieces; join them before stripping.
+        data = "".join(self._pending).strip()
+        self._pending.clear()
+        if not data or self.full:
+            return
+        if self.parts:
+            self.chars += 1
+        data = data[:self.max_chars - self.chars]
+        self.parts.append(data)
+        self.chars += len(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._emit()
+        if tag in self._SKIP:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        self._emit()
+        if tag in self._SKIP and self._skip:
+            self._skip -= 1
+
+    def handle_comment(self, data):
+        self._emit()
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._pending.append(data)
+
+    def text(self):
+        self.close()
+        self._emit()
+        return " ".join(self.parts)[:self.max_chars]
+
+def extract_text(chunks, encoding="utf-8", max_chars=MAX_PAGE_CHARS):
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = _TextExtractor(max_chars)
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        if parser.full:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+    return parser.text()
+
+def _read_capped(r, max_bytes):
+    chunks, size = [], 0
+    for chunk in r.iter_content(CHUNK_BYTES):
+        chunk = chunk[:max_bytes - size]
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            break
+    return chunks
+
 def scan_website(url):
     try:
-        r = requests.get(url, timeout=5)
-        soup = BeautifulSoup(r.text, "html.parser")
-        return soup.get_text(separator=" ", strip=True)
+        return fetch_website(url, {})
     except Exception as e:
         return f"Error: {e}"
 
 def scan_rss(feed_url):
     try:
-        feed = feedparser.parse(feed_url)
-        return " ".join([entry.title + " " + entry.summary for entry in feed.entries])
+        return fetch_rss(feed_url, {})
     except Exception as e:
         return f"Error: {e}"
 
+# --- Change Detection ---
+# Per-source validators (ETag / Last-Modified) and a content hash, so the
+# scanner can send conditional requests and skip parsing, encoding and
+# storing anything that has not changed since the previous cycle.
+def _unchanged(state, *chunks):
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        digest.update(chunk)
+    digest = digest.hexdigest()
+    if state.get("hash") == digest:
+        return True
+    state["hash"] = digest
+    return False
+
+def _conditional_get(url, state, **kwargs):
+    """GET through the shared transport; returns None on 304 Not Modified."""
+    headers = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        headers["If-Modified-Since"] = state["last_modified"]
+    r = NetSC.get(url, timeout=5, headers=headers, **kwargs)
+    if r.status_code == 304:
+        r.close()
+        return None
+    state["etag"] = r.headers.get("ETag")
+    state["last_modified"] = r.headers.get("Last-Modified")
+    return r
+
+# Fetchers given a ``stats`` dict fill in "fetch" and "parse" seconds and
+# the response "bytes" for the scanner's metrics.
+def fetch_website(url, state, max_bytes=MAX_PAGE_BYTES, max_chars=MAX_PAGE_CHARS, stats=None):
+    start = time.perf_counter()
+    r = _conditional_get(url, state, stream=True)
+    if r is None:
+        return None
+    with r:
+        chunks = _read_capped(r, max_bytes)
+    if stats is not None:
+        stats["fetch"] = time.perf_counter() - start
+        stats["bytes"] = sum(map(len, chunks))
+    if _unchanged(state, *chunks):
+        return None
+    start = time.perf_counter()
+    text = extract_text(chunks, r.encoding or "utf-8", max_chars)
+    if stats is not None:
+        stats["parse"] = time.perf_counter() - start
+    return text
+
+def fetch_rss(feed_url, state):
+    r = _conditional_get(feed_url, state)
+    if r is None:
+        return None
+    feed = feedparser.parse(r.content)
+    text = " ".join([entry.title + " " + entry.summary for entry in feed.entries])
+    if _unchanged(state, text.encode("utf-8")):
+        return None
+    return text
+
+def fetch_source(src, state, stats=None):
+    """Like scan_source, but returns None if the source is unchanged since ``state``.
+
+    A failed fetch leaves its message in ``state["error"]``.
+    """
+    state.pop("error", None)
+    try:
+        if src["type"] == "website":
+            return fetch_website(src["url"], state, src.get("max_bytes", MAX_PAGE_BYTES),
+                                 src.get("max_chars", MAX_PAGE_CHARS), stats)
+        if src["type"] == "rss":
+            return fetch_rss(src["url"], state)
+        text = scan_source(src)
+    except Exception as e:
+        # Validators describe the last good response, which is no longer
+        # what the KB holds once the error text replaces it.
+        state.pop("etag", None)
+        state.pop("last_modified", None)
+        state["error"] = str(e)
+        text = f"Error: {e}"
+    if text is None or _unchanged(state, text.encode("utf-8")):
+        return None
+    return text
+
+# RSS feeds are tracked per entry: state["entries"] maps each entry's id
+# (GUID, else link, else title) to its published time and content hash,
+# so only new or edited entries are emitted, each as its own document.
+def fetch_rss_entries(src, state, stats=None):
+    start = time.perf_counter()
+    r = _conditional_get(src["url"], state)
+    if r is None:
+        return []
+    if stats is not None:
+        stats["fetch"] = time.perf_counter() - start
+        stats["bytes"] = len(r.content)
+    if _unchanged(state, r.content):
+        return []
+    start = time.perf_counter()
+    feed = feedparser.parse(r.content)
+    seen = state.get("entries", {})
+    current, docs = {}, []
+    for entry in feed.entries:
+        guid = entry.get("id") or entry.get("link") or entry.get("title", "")
+        text = entry.get("title", "") + " " + entry.get("summary", "")
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        current[guid] = f"{entry.get('updated') or entry.get('published') or ''}|{digest}"
+        if seen.get(guid) != current[guid]:
+            doc_src = dict(src, entry=guid)
+            if entry.get("link"):
+                doc_src["link"] = entry["link"]
+            docs.append((f"{src['url']}#{guid}", doc_src, text))
+    if stats is not None:
+        stats["parse"] = time.perf_counter() - start
+    # Entries that dropped out of the feed are forgotten, so the state
+    # never grows past the feed's own size.
+    state["entries"] = current
+    return docs
+
+def fetch_documents(src, state, stats=None):
+    """Return [(KB key, src, text)] for content of ``src`` that is new since ``state``.
+
+    RSS feeds yield one document per new or updated entry, keyed
+    "<feed url>#<entry id>"; every other source yields at most one.
+    """
+    if src["type"] != "rss":
+        text = fetch_source(src, state, stats)
+        return [] if text is None else [(source_key(src), src, text)]
+    state.pop("error", None)
+    try:
+        return fetch_rss_entries(src, state, stats)
+    except Exception as e:
+        # The feed hash is stored before its entries are processed; drop it
+        # with the validators so the next poll processes the feed again.
+        state.pop("etag", None)
+        state.pop("last_modified", None)
+        state.pop("hash", None)
+        state["error"] = str(e)
+        return []
+
 # --- Knowledge Base ---
+# The KB is a log-structured store (see ScanKB.py) that only appends the
+# entries changed in each cycle and keeps just a key index in memory;
+# atomic sequences are read back from the mapped segments on access.
+# KB_FILE is the old single-file JSON KB, imported once on first load and
+# then renamed to KB_FILE + ".migrated".
 KB_FILE = "prosc_kb.json"
+KB_DIR = "prosc_kb"
+def _load_legacy_kb():
+    try:
+        with open(KB_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except:
+        return {}
+    return {k: AtomicSeq(v.encode("ascii")) if isinstance(v, str) else AtomicSeq.from_units(v)
+            for k, v in data.items()}
 def save_kb(data):
-    with open(KB_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Write ``data`` to the KB; returns the number of entries written."""
+    if isinstance(data, KBStore):
+        return data.flush()
+    with KBStore(KB_DIR, wrap=AtomicSeq, background=False) as kb:
+        for key in [k for k in kb if k not in data]:
+            del kb[key]
+        kb.update(data)
+        return kb.flush()
 def load_kb():
+    kb = KBStore(KB_DIR, wrap=AtomicSeq)
+    if not len(kb) and os.path.exists(KB_FILE):
+        kb.update(_load_legacy_kb())
+        kb.flush()
+        os.replace(KB_FILE, KB_FILE + ".migrated")
+    return kb
+
+FETCH_STATE_FILE = "prosc_fetch_state.json"
+def save_fetch_state(state):
+    # Write a temp file and swap it in, so a crash mid-write cannot leave
+    # a broken file that loads as {} and loses every validator.
+    tmp = FETCH_STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, FETCH_STATE_FILE)
+def load_fetch_state():
     try:
-        with open(KB_FILE, "r", encoding="utf-8") as f:
+        with open(FETCH_STATE_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
     except:
         return {}
 
+# --- Source Dispatch ---
+SOURCE_FIELDS = {"website": "url", "rss": "url", "twitter": "handle", "discord": "channel", "telegram": "chat"}
+
+# Optional per-source limits: scheduling intervals (seconds, any positive
+# number) and page caps (positive ints).
+SOURCE_INTERVALS = ("interval", "min_interval", "max_interval")
+SOURCE_CAPS = ("max_bytes", "max_chars")
+
+def validate_source(src):
+    if not isinstance(src, dict):
+        raise ValueError("Source must be an object")
+    field = SOURCE_FIELDS.get(src.get("type"))
+    if field is None:
+        raise ValueError(f"Unknown source type: {src.get('type')}")
+    if not src.get(field):
+        raise ValueError(f"{src['type']} source needs a '{field}'")
+    for name in set(SOURCE_FIELDS.values()) & src.keys():
+        if not isinstance(src[name], str):
+            raise ValueError(f"'{name}' must be a string")
+    if "url" in src:
+        parts = urlsplit(src["url"])
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"'url' must be an http(s) URL: {src['url']}")
+    for name in SOURCE_INTERVALS + SOURCE_CAPS:
+        value = src.get(name)
+        if value is None:
+            continue
+        kinds = int if name in SOURCE_CAPS else (int, float)
+        if isinstance(value, bool) or not isinstance(value, kinds) or not 0 < value < float("inf"):
+            raise ValueError(f"'{name}' must be a positive {'integer' if name in SOURCE_CAPS else 'number'}")
+    return src
+
+def source_key(src):
+    return src.get("url", src.get("handle", src.get("channel", src.get("chat",""))))
+
+def source_host(src):
+    # Sources without a URL are simulated locally; group them by type.
+    if "url" in src:
+        return urlsplit(src["url"]).netloc.lower()
+    return src["type"]
+
+def scan_source(src):
+    if src["type"] == "website":
+        return scan_website(src["url"])
+    elif src["type"] == "rss":
+        return scan_rss(src["url"])
+    elif src["type"] == "twitter":
+        return f"Simulated Twitter: {src['handle']}"
+    elif src["type"] == "discord":
+        return f"Simulated Discord: {src['channel']}"
+    elif src["type"] == "telegram":
+        return f"Simulated Telegram: {src['chat']}"
+    return None
+
+# --- Bounded Source Queue ---
+class SourceQueue:
+    """Bounded queue of (src, atomic) items between the scanner and consumers.
+
+    When the queue is full, ``policy`` decides what ``put`` does: "block"
+    waits for room (backpressure on the scanner), "drop_oldest" evicts the
+    oldest item, and "coalesce" replaces the item already queued for the
+    same source key, dropping the oldest item if that source has none.
+    """
+    POLICIES = ("block", "drop_oldest", "coalesce")
+
+    def __init__(self, maxsize=1000, policy="block"):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._items = OrderedDict()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+
+    def _full(self):
+        return 0 < self.maxsize <= len(self._items)
+
+    def put(self, item, key=None, timeout=None):
+        """Queue ``item``; returns False if it was not queued (closed or timed out)."""
+        with self._lock:
+            if self.closed:
+                return False
+            if self.policy == "coalesce" and key is not None and key in self._items:
+                self._items[key] = item
+                self.coalesced += 1
+                return True
+            if self._full():
+                if self.policy == "block":
+                    self._not_full.wait_for(lambda: not self._full() or self.closed, timeout)
+                    if self.closed or self._full():
+                        return False
+                else:
+                    self._items.popitem(last=False)
+                    self.dropped += 1
+            if self.policy != "coalesce" or key is None:
+                key = next(self._seq)
+            self._items[key] = item
+            self._not_empty.notify()
+            return True
+
+    def get_batch(self, max_items=None, timeout=None):
+        """Wait up to ``timeout`` seconds for items, then return up to ``max_items``."""
+        with self._lock:
+            if not self._items and timeout != 0:
+                self._not_empty.wait_for(lambda: self._items or self.closed, timeout)
+            n = len(self._items) if max_items is None else min(max_items, len(self._items))
+            batch = [self._items.popitem(last=False)[1] for _ in range(n)]
+            if batch:
+                self._not_full.notify_all()
+            return batch
+
+    def get(self, block=True, timeout=None):
+        batch = self.get_batch(1, timeout if block else 0)
+        if not batch:
+            raise queue.Empty
+        return batch[0]
+
+    def close(self):
+        """Reject further puts and wake every waiting producer and consumer."""
+        with self._lock:
+            self.closed = True
+            self._not_full.notify_all()
+            self._not_empty.notify_all()
+
+    def qsize(self):
+        return len(self._items)
+
+    def empty(self):
+        return not self._items
+
+    __len__ = qsize
+
 # --- Streaming Scanner Thread ---
+# Adaptive polling: a source that changed is polled SPEEDUP times sooner
+# next time and one that did not SLOWDOWN times later, kept within its
+# [min_interval, max_interval] (default interval/4 .. interval*4).
+# Failing sources back off exponentially up to MAX_BACKOFF seconds, and
+# every delay gets +/-JITTER so sources sharing an interval spread out.
+SPEEDUP = 0.5
+SLOWDOWN = 1.5
+JITTER = 0.1
+MAX_BACKOFF = 3600
+
+class _Schedule:
+    __slots__ = ("src", "host", "interval", "failures", "gen")
+
+    def __init__(self, src, interval):
+        self.src = src
+        self.host = source_host(src)
+        self.interval = interval
+        self.failures = 0
+        self.gen = 0
+
 class StreamingScanner(threading.Thread):
-    def __init__(self, sources, interval=60):
+    """Polls each source on its own adaptive schedule.
+
+    Next-due times live in a heap; a source's ``interval`` key overrides
+    the scanner-wide ``interval``. Due sources are fetched in parallel on
+    a thread pool of ``max_workers`` threads, with at most ``per_host``
+    requests in flight against any one host, and results are applied to
+    the KB and queue from this thread. Sources that have not changed
+    since their last fetch are skipped, and RSS feeds only store and
+    enqueue their new or updated entries. If an ``index`` is given, stored
+    content is also added to it. Results go to a SourceQueue of
+    ``queue_size`` items using the ``overflow`` policy.
+
+    With ``dedup`` set, content whose SimHash is within
+    ``dedup_distance`` bits of another source's is either enqueued with a
+    "duplicate_of" key ("flag") or not stored or enqueued at all
+    ("collapse"); ``duplicates`` maps such sources to the original.
+
+    Per-source fetch latency, response size, parse and encode times,
+    fetch/error/document counts and queue gauges are recorded in
+    ``metrics`` (a ScanMetrics.Metrics, created if not given). KB writes
+    only buffer until the next flush, so KB write cost is tracked
+    scanner-wide (kb_flush_seconds, kb_records_written_total), not per
+    source.
+
+    ``stop()``, ``reconfigure()`` and ``add_source``/``update_source``/
+    ``remove_source`` are thread-safe and wake the scheduler immediately.
+    """
+
+    def __init__(self, sources, interval=60, max_workers=16, per_host=2, index=None,
+                 queue_size=1000, overflow="block", flush_interval=5, dedup=None, dedup_distance=3,
+                 metrics=None):
         super().__init__()
-        self.sources = sources
+        self.sources = list(sources)
         self.interval = interval
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.index = index
+        self.flush_interval = flush_interval
+        if dedup not in (None, "flag", "collapse"):
+            raise ValueError(f"Unknown dedup mode: {dedup}")
+        self.dedup = dedup
+        self.dedup_index = SimHashIndex(dedup_distance)
+        self.duplicates = {}
         self.kb = load_kb()
-        self.queue = queue.Queue()
+        self.fetch_state = load_fetch_state()
+        self.queue = SourceQueue(queue_size, overflow)
         self.running = True
-
-    def run(self):
-        while self.running:
-            for src in self.sources:
-                if src["type"] == "website":
-                    text = scan_website(src["url"])
-                elif src["type"] == "rss":
-                    text = scan_rss(src["url"])
-                elif src["type"] == "twitter":
-                    text = f"Simulated Twitter: {src['handle']}"
-                elif src["type"] == "discord":
-                    text = f"Simulated Discord: {src['channel']}"
-                elif src["type"] == "telegram":
-                    text = f"Simulated Telegram: {src['chat']}"
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._reconfigured = True
+        self._purge = set()      # keys of removed sources whose KB entries go too
+        self._sched = {}         # key -> _Schedule
+        self._heap = []          # (due, seq, key, generation)
+        self._seq = itertools.count()
+        self._waiting = {}       # host -> deque of due keys over the per-host cap
+        self._active = {}        # host -> requests in flight
+        self._inflight = set()
+        self._done = deque()
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.gauge("queue_depth", self.queue.qsize)
+        self.metrics.gauge("queue_dropped", lambda: self.queue.dropped)
+        self.metrics.gauge("queue_coalesced", lambda: self.queue.coalesced)
+        self.metrics.gauge("sources", lambda: len(self._sched))
+        self.metrics.gauge("inflight", lambda: len(self._inflight))
+        self.metrics.gauge("kb_entries", lambda: len(self.kb))
+
+    def _limits(self, src):
+        base = src.get("interval", self.interval)
+        return base, src.get("min_interval", base / 4), src.get("max_interval", base * 4)
+
+    def _push(self, key, due):
+        sch = self._sched[key]
+        sch.gen += 1
+        heapq.heappush(self._heap, (due, next(self._seq), key, sch.gen))
+
+    def _sync_sources(self):
+        with self._lock:
+            sources = list(self.sources)
+            purge, self._purge = self._purge, set()
+            self._reconfigured = False
+        now = time.monotonic()
+        seen = set()
+        for src in sources:
+            try:
+                key = source_key(validate_source(src))
+                base, lo, hi = self._limits(src)
+                sch = self._sched.get(key)
+                if sch is None or sch.src != src:
+                    # New or edited source: poll it right away.
+                    sch = _Schedule(src, base)
+                    self._sched[key] = sch
+                    self._push(key, now)
                 else:
+                    sch.interval = min(max(sch.interval, lo), hi)
+            except Exception as e:
+                # Sources given to the constructor or reconfigure() are not
+                # validated up front; skip a bad one (source_status reports
+                # it) rather than let it stop the scanner.
+                _log.error("Skipping invalid source %r: %s", src, e)
+                continue
+            seen.add(key)
+        for key in [k for k in self._sched if k not in seen]:
+            del self._sched[key]
+        for key in purge - seen:
+            self._drop(key)
+        return bool(purge - seen)
+
+    def _drop(self, key):
+        # RSS entries are stored as "<feed url>#<entry id>".
+        prefix = key + "#"
+        for doc in [k for k in self.kb if k == key or k.startswith(prefix)]:
+            del self.kb[doc]
+            if self.index is not None:
+                self.index.remove(doc)
+            self.dedup_index.remove(doc)
+            self.duplicates.pop(doc, None)
+        self.fetch_state.pop(key, None)
+        self.metrics.forget(key)
+
+    def _fetch(self, src, state):
+        source, stats, docs = source_key(src), {}, []
+        start = time.perf_counter()
+        found = fetch_documents(src, state, stats)
+        self.metrics.observe("fetch_seconds", stats.get("fetch", time.perf_counter() - start), source)
+        if "bytes" in stats:
+            self.metrics.observe("response_bytes", stats["bytes"], source)
+        if "parse" in stats:
+            self.metrics.observe("parse_seconds", stats["parse"], source)
+        encode = 0.0
+        for key, doc_src, text in found:
+            start = time.perf_counter()
+            atomic_data = encode_atomic(text)
+            encode += time.perf_counter() - start
+            docs.append((key, doc_src, atomic_data, simhash(text) if self.dedup else None))
+        if docs:
+            self.metrics.observe("encode_seconds", encode, source)
+        return docs, state
+
+    def _complete(self, key, host, src, fut):
+        self._done.append((key, host, src, fut))
+        self._wake.set()
+
+    def _dispatch_due(self, pool, now):
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key, gen = heapq.heappop(self._heap)
+            sch = self._sched.get(key)
+            if sch is None or sch.gen != gen or key in self._inflight:
+                continue
+            self._waiting.setdefault(sch.host, deque()).append(key)
+        # Only hand a host's next source to the pool once one of its slots
+        # frees up, so a slow host cannot tie up every worker.
+        for host, keys in self._waiting.items():
+            while keys and self._active.get(host, 0) < self.per_host:
+                key = keys.popleft()
+                sch = self._sched.get(key)
+                if sch is None or key in self._inflight:
                     continue
-                atomic_data = encode_atomic(text)
-                self.kb[src.get("url", src.get("handle", src.get("channel", src.get("chat",""))))] = atomic_data
-                self.queue.put((src, atomic_data))
-            save_kb(self.kb)
-            time.sleep(self.interval)
+                state = dict(self.fetch_state.get(key, {}))
+                fut = pool.submit(self._fetch, sch.src, state)
+                self._inflight.add(key)
+                self._active[host] = self._active.get(host, 0) + 1
+                fut.add_done_callback(lambda f, k=key, h=host, s=sch.src: self._complete(k, h, s, f))
+
+    def _apply_results(self):
+        changed = 0
+        while self._done:
+            key, host, src, fut = self._done.popleft()
+            self._inflight.discard(key)
+            self._active[host] -= 1
+            try:
+                docs, state = fut.result()
+            except Exception as e:
+                docs, state = [], dict(self.fetch_state.get(key, {}), error=str(e))
+            sch = self._sched.get(key)
+            if sch is None:
+                continue  # removed while in flight
+            if sch.src is not src:
+                self._push(key, time.monotonic())  # edited while in flight
+                continue
+            self.fetch_state[key] = state
+            self.metrics.inc("fetches_total", key)
+            base, lo, hi = self._limits(src)
+            if state.get("error"):
+                self.metrics.inc("errors_total", key)
+                sch.failures += 1
+                delay = min(MAX_BACKOFF, sch.interval * 2 ** sch.failures)
+            else:
+                sch.failures = 0
+                factor = SPEEDUP if docs else SLOWDOWN
+                sch.interval = delay = min(max(sch.interval * factor, lo), hi)
+            self._push(key, time.monotonic() + delay * random.uniform(1 - JITTER, 1 + JITTER))
+            for doc_key, doc_src, atomic_data, fp in docs:
+                if self._store(doc_key, doc_src, atomic_data, fp):
+                    changed += 1
+        return changed
+
+    def _store(self, key, src, atomic_data, fp):
+        if fp is not None:
+            original = self.dedup_index.find(fp, exclude=key)
+            if original is None:
+                self.duplicates.pop(key, None)
+                self.dedup_index.add(key, fp)
+            else:
+                self.duplicates[key] = original
+                self.dedup_index.remove(key)
+                if self.dedup == "collapse":
+                    if key in self.kb:
+                        del self.kb[key]
+                        if self.index is not None:
+                            self.index.remove(key)
+                        return True
+                    return False
+                src = dict(src, duplicate_of=original)
+        source = source_key(src)
+        self.kb[key] = atomic_data
+        if self.index is not None:
+            self.index.add(key, decode_atomic(atomic_data))
+        self.queue.put((src, atomic_data), key)
+        self.metrics.inc("documents_total", source)
+        return True
+
+    def _flush(self):
+        with self.metrics.time("kb_flush_seconds"):
+            written = save_kb(self.kb)
+        self.metrics.inc("kb_records_written_total", value=written or 0)
+        save_fetch_state(self.fetch_state)
+
+    def run(self):
+        if self.index is not None:
+            # Unchanged sources are never re-fetched, so seed the index from
+            # what the KB already holds.
+            for key in self.kb:
+                if key not in self.index:
+                    self.index.add(key, decode_atomic(self.kb[key]))
+        if self.dedup:
+            for key in self.kb:
+                if key not in self.dedup_index:
+                    self.dedup_index.add(key, simhash(decode_atomic(self.kb[key])))
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="prosc-scan")
+        dirty, last_flush = False, time.monotonic()
+        try:
+            while not self._stopped.is_set():
+                if self._reconfigured:
+                    dirty = self._sync_sources() or dirty
+                dirty = self._apply_results() > 0 or dirty
+                now = time.monotonic()
+                # Write changes once nothing is in flight, or at least every
+                # flush_interval seconds while fetches keep completing.
+                if dirty and (not self._inflight or now - last_flush >= self.flush_interval):
+                    self._flush()
+                    dirty, last_flush = False, now
+                self._dispatch_due(pool, now)
+                deadlines = [self._heap[0][0]] if self._heap else []
+                if dirty:
+                    deadlines.append(last_flush + self.flush_interval)
+                self._wake.wait(max(0, min(deadlines) - now) if deadlines else None)
+                self._wake.clear()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            if dirty:
+                self._flush()
+
+    def reconfigure(self, sources=None, interval=None):
+        """Replace the source list and/or default interval; applied on the next wake-up."""
+        with self._lock:
+            if sources is not None:
+                self.sources = list(sources)
+            if interval is not None:
+                self.interval = interval
+            self._reconfigured = True
+        self._wake.set()
+
+    def add_source(self, src):
+        """Start polling ``src`` in the next scheduling slot; returns its source key."""
+        key = source_key(validate_source(src))
+        with self._lock:
+            if any(source_key(s) == key for s in self.sources):
+                raise ValueError(f"Source already registered: {key}")
+            self.sources = self.sources + [src]
+            self._purge.discard(key)
+            self._reconfigured = True
+        self._wake.set()
+        return key
+
+    def update_source(self, key, src):
+        """Replace the source registered under ``key``; it is re-polled right away."""
+        new_key = source_key(validate_source(src))
+        with self._lock:
+            keys = [source_key(s) for s in self.sources]
+            if key not in keys:
+                raise KeyError(key)
+            if new_key != key and new_key in keys:
+                raise ValueError(f"Source already registered: {new_key}")
+            sources = list(self.sources)
+            sources[keys.index(key)] = src
+            self.sources = sources
+            self._reconfigured = True
+        self._wake.set()
+        return new_key
+
+    def remove_source(self, key, purge=False):
+        """Stop polling ``key``; with ``purge`` its KB, index and fetch state are dropped too."""
+        with self._lock:
+            sources = [s for s in self.sources if source_key(s) != key]
+            if len(sources) == len(self.sources):
+                raise KeyError(key)
+            self.sources = sources
+            if purge:
+                self._purge.add(key)
+            self._reconfigured = True
+        self._wake.set()
+
+    def source_status(self):
+        """[{key, source, interval, failures, error}] for every registered source."""
+        with self._lock:
+            sources = list(self.sources)
+        status = []
+        for src in sources:
+            try:
+                key = source_key(validate_source(src))
+            except ValueError as e:
+                key = source_key(src) if isinstance(src, dict) else None
+                status.append({"key": key, "source": src, "interval": None, "failures": 0,
+                               "error": f"Invalid source: {e}"})
+                continue
+            sch = self._sched.get(key)
+            status.append({"key": key, "source": src,
+                           "interval": sch.interval if sch else None,
+                           "failures": sch.failures if sch else 0,
+                           "error": self.fetch_state.get(key, {}).get("error")})
+        return status
 
     def stop(self):
         self.running = False
+        self._stopped.set()
+        self._wake.set()
+        self.queue.close()
 
-    def fetch_latest(self):
-        items = []
-        while not self.queue.empty():
-            items.append(self.queue.get())
-        return items
+    def fetch_latest(self, max_items=None, timeout=0):
+        """Return up to ``max_items`` queued items, waiting up to ``timeout`` seconds for the first."""
+        return self.queue.get_batch(max_items, timeout)
 
 # --- Multi-AI Modules Placeholder ---
 def gpt_module(atomic_data): return [u+"G" for u in atomic_data]
@@ -216,20 +887,62 @@ def deebspeak_module(atomic_data): return [u+"D" for u in atomic_data]
 def gbnai_module(atomic_data): return [u+"N" for u in atomic_data]
 
 def merge_atomic(*modules):
+    # Position i comes from the first module long enough to have it, so
+    # each module only contributes its tail past the longest one before it.
     combined = []
-    max_len = max(len(m) for m in modules)
-    for i in range(max_len):
-        for m in modules:
-            if i < len(m):
-                combined.append(m[i])
-                break
+    for m in modules:
+        if len(m) > len(combined):
+            combined.extend(m[len(combined):])
     return combined
 
+def _run_stage(stage, docs):
+    return [stage(doc) for doc in docs]
+
+class AIPipeline:
+    """Runs AI stages over batches of queued documents on a process pool.
+
+    Every stage receives the same atomic input and their outputs are
+    combined with ``merge``. Each (stage, batch) pair is a separate pool
+    task, so stages and batches run concurrently. Stages must be
+    top-level functions so they can be sent to worker processes.
+    """
+
+    def __init__(self, stages=(gpt_module, deebspeak_module, gbnai_module), merge=merge_atomic,
+                 workers=None, batch_size=16):
+        self.stages = list(stages)
+        self.merge = merge
+        self.batch_size = batch_size
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+
+    def add_stage(self, stage):
+        self.stages.append(stage)
+
+    def process(self, items):
+        """Return [(src, merged)] for a list of (src, atomic) items, in order."""
+        docs = [atomic for _, atomic in items]
+        pending = []
+        for i in range(0, len(docs), self.batch_size):
+            batch = docs[i:i + self.batch_size]
+            pending.append([self._pool.submit(_run_stage, stage, batch) for stage in self.stages])
+        merged = []
+        for futures in pending:
+            outputs = [f.result() for f in futures]
+            merged.extend(self.merge(*per_doc) for per_doc in zip(*outputs))
+        return [(src, m) for (src, _), m in zip(items, merged)]
+
+    def close(self):
+        self._pool.shutdown()
+
 def generate_auto_link(module_name):
     return f"# Auto-link: {module_name}\nregister_module('{module_name}')\n"
 
 # --- Example Usage ---
-if __name__ == "__main__":
+_preview_log = LogSC.get_logger("Preview")
+
+def main():
+    # Only the demo serves HTTP, so the scanner library does not need Flask.
+    import ScanWeb
+
     sources = [
         {"type":"website", "url":"https://example.com"},
         {"type":"rss", "url":"https://news.google.com/rss"},
@@ -238,21 +951,26 @@ if __name__ == "__main__":
         {"type":"telegram", "chat":"@examplechat"}
     ]
 
-    scanner = StreamingScanner(sources, interval=300)
+    scanner = StreamingScanner(sources, interval=300, index=InvertedIndex())
+    pipeline = AIPipeline()
     scanner.start()
-    print("ProSC Full Ultimate Streaming Multi-AI Repo running...")
+    threading.Thread(target=ScanWeb.run_web, args=(scanner,), daemon=True).start()
+    _log.info("Search API running at http://localhost:5001/search?q=... (metrics at /metrics)")
+    _log.info("ProSC Full Ultimate Streaming Multi-AI Repo (scan.py) running...")
 
     try:
         while True:
-            time.sleep(10)
-            latest = scanner.fetch_latest()
-            for src, atomic in latest:
-                # Merge atomic with multi-AI placeholders
-                merged = merge_atomic(gpt_module(atomic), deebspeak_module(atomic), gbnai_module(atomic))
+            latest = scanner.fetch_latest(max_items=32, timeout=10)
+            for src, merged in pipeline.process(latest):
                 decoded_preview = decode_atomic(merged[:100])
-                print(f"[Preview] {src}: {decoded_preview}...")
+                _preview_log.info("%s: %s...", src, decoded_preview)
                 link_code = generate_auto_link("MergedModule")
-                print(f"Generated Auto-Link:\n{link_code}")
+                _log.info("Generated Auto-Link:\n%s", link_code)
     except KeyboardInterrupt:
         scanner.stop()
-        print("ProSC Ultimate Streaming Repo stopped.")
+        pipeline.close()
+        _log.info("ProSC Ultimate Streaming Repo (scan.py) stopped.")
+        LogSC.flush()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# File: scanbench.py
+# Benchmarks for the scan pipeline against a local HTTP/RSS stand-in.
+#
+#   python ScanBench.py                        # run every scenario
+#   python ScanBench.py --sources 200 --latency 0.2 --out run.json
+#   python ScanBench.py --baseline run.json    # exit 1 on a docs/sec regression
+#
+# Each scenario reports docs/sec, p50/p99 latency in milliseconds and the
+# process's peak RSS so far. Nothing is written outside a temp directory.
+import argparse, json, os, random, shutil, sys, tempfile, threading, time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import Scan
+
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima "
+         "mike november oscar papa quebec romeo sierra tango uniform victor whiskey").split()
+
+# --- Local stand-in server ---
+class StandIn:
+    """Serves synthetic pages at /page/<n> and feeds at /rss/<n>.
+
+    Every response waits ``latency`` seconds first. Content changes on
+    each request with probability ``change_rate`` so the scanner's
+    change detection can be exercised as well as bypassed.
+    """
+
+    def __init__(self, latency=0.05, page_bytes=20_000, rss_items=20, change_rate=1.0, seed=1):
+        self.latency = latency
+        self.page_bytes = page_bytes
+        self.rss_items = rss_items
+        self.change_rate = change_rate
+        self.served = {}    # path -> time of the last response
+        self._versions = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _text(self, path, version, size):
+        rng = random.Random(f"{path}:{version}")
+        words, n = [], 0
+        while n < size:
+            word = rng.choice(WORDS)
+            words.append(word)
+            n += len(word) + 1
+        return " ".join(words)
+
+    def _handle(self, req):
+        time.sleep(self.latency)
+        with self._lock:
+            version = self._versions.get(req.path, 0)
+            if self._rng.random() < self.change_rate:
+                version += 1
+            self._versions[req.path] = version
+        if req.path.startswith("/rss/"):
+            per_item = max(self.page_bytes // max(self.rss_items, 1), 16)
+            items = "".join(
+                f"<item><guid>{req.path}-{version}-{i}</guid><title>Item {i}</title>"
+                f"<description>{self._text(req.path + str(i), version, per_item)}</description></item>"
+                for i in range(self.rss_items))
+            body = f"<?xml version='1.0'?><rss version='2.0'><channel><title>bench</title>{items}</channel></rss>"
+            ctype = "application/rss+xml"
+        else:
+            body = f"<html><body><p>{self._text(req.path, version, self.page_bytes)}</p></body></html>"
+            ctype = "text/html; charset=utf-8"
+        data = body.encode("utf-8")
+        req.send_response(200)
+        req.send_header("Content-Type", ctype)
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+        with self._lock:
+            self.served[req.path] = time.perf_counter()
+
+# --- Reporting ---
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def report(name, docs, elapsed, latencies, **extra):
+    result = {
+        "scenario": name,
+        "docs": docs,
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(docs / elapsed, 1) if elapsed else None,
+        "p50_ms": None if not latencies else round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": None if not latencies else round(percentile(latencies, 99) * 1000, 3),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    result.update(extra)
+    return result
+
+def _timed(fn, items):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - t)
+    return time.perf_counter() - start, latencies
+
+# --- Scenarios ---
+def bench_codec(args, stand_in):
+    texts = [stand_in._text(f"/codec/{i}", 0, args.page_bytes) for i in range(args.docs)]
+    encode_s, encode_lat = _timed(Scan.encode_atomic, texts)
+    seqs = [Scan.encode_atomic(t) for t in texts]
+    decode_s, decode_lat = _timed(Scan.decode_atomic, seqs)
+    return [report("encode_atomic", len(texts), encode_s, encode_lat, bytes_per_doc=args.page_bytes),
+            report("decode_atomic", len(seqs), decode_s, decode_lat, bytes_per_doc=args.page_bytes)]
+
+def bench_merge(args, stand_in):
+    seqs = [Scan.encode_atomic(stand_in._text(f"/merge/{i}", 0, args.page_bytes)) for i in range(args.docs)]
+    outputs = [(Scan.gpt_module(s), Scan.deebspeak_module(s), Scan.gbnai_module(s)) for s in seqs]
+    elapsed, latencies = _timed(lambda mods: Scan.merge_atomic(*mods), outputs)
+    return [report("merge_atomic", len(outputs), elapsed, latencies, modules=3)]
+
+def bench_kb(args, stand_in, workdir):
+    seqs = [Scan.encode_atomic(stand_in._text(f"/kb/{i}", 0, args.page_bytes)) for i in range(args.docs)]
+    kb = Scan.load_kb()
+    batches = [seqs[i:i + args.kb_batch] for i in range(0, len(seqs), args.kb_batch)]
+    rng = random.Random(args.seed)
+
+    def write(batch):
+        for seq in batch:
+            kb[f"doc-{rng.randrange(args.docs * 2)}"] = seq
+        Scan.save_kb(kb)
+
+    elapsed, latencies = _timed(write, batches)
+    kb.close()
+    return [report("save_kb", len(seqs), elapsed, latencies, batch=args.kb_batch)]
+
+def bench_scanner(args, stand_in, workdir):
+    sources = []
+    for i in range(args.sources):
+        kind = "rss" if i < args.sources * args.rss_share else "website"
+        path = f"/{'rss' if kind == 'rss' else 'page'}/{i}"
+        sources.append({"type": kind, "url": stand_in.url + path,
+                        "interval": args.interval, "min_interval": args.interval, "max_interval": args.interval})
+    scanner = Scan.StreamingScanner(sources, max_workers=args.workers, per_host=args.workers,
+                                    queue_size=args.queue_size, overflow=args.overflow)
+    latencies, docs = [], 0
+    scanner.start()
+    start = time.perf_counter()
+    deadline = start + args.duration
+    while time.perf_counter() < deadline:
+        for src, atomic in scanner.fetch_latest(max_items=64, timeout=0.1):
+            now = time.perf_counter()
+            served = stand_in.served.get(src["url"][len(stand_in.url):])
+            if served is not None:
+                latencies.append(now - served)
+            docs += 1
+            if args.consumer_delay:
+                time.sleep(args.consumer_delay)
+    elapsed = time.perf_counter() - start
+    scanner.stop()
+    scanner.join()
+    scanner.kb.close()
+    return [report("scanner", docs, elapsed, latencies, sources=args.sources, latency_s=args.latency,
+                   consumer_delay_s=args.consumer_delay, dropped=scanner.queue.dropped)]
+
+SCENARIOS = ("codec", "merge", "kb", "scanner")
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="prosc-bench-")
+    Scan.KB_DIR = os.path.join(workdir, "prosc_kb")
+    Scan.KB_FILE = os.path.join(workdir, "prosc_kb.json")
+    Scan.FETCH_STATE_FILE = os.path.join(workdir, "prosc_fetch_state.json")
+    stand_in = StandIn(args.latency, args.page_bytes, args.rss_items, args.change_rate, args.seed).start()
+    results = []
+    try:
+        for name in args.scenarios:
+            if name == "codec":
+                results += bench_codec(args, stand_in)
+            elif name == "merge":
+                results += bench_merge(args, stand_in)
+            elif name == "kb":
+                results += bench_kb(args, stand_in, workdir)
+            elif name == "scanner":
+                results += bench_scanner(args, stand_in, workdir)
+    finally:
+        stand_in.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return the scenarios whose docs/sec fell more than ``tolerance`` below the baseline."""
+    before = {r["scenario"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        old = before.get(r["scenario"])
+        if old and old.get("docs_per_sec") and r["docs_per_sec"] is not None:
+            change = r["docs_per_sec"] / old["docs_per_sec"] - 1
+            r["vs_baseline"] = round(change, 3)
+            if change < -tolerance:
+                regressions.append(r["scenario"])
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ProSC scan pipeline.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--sources", type=int, default=50)
+    parser.add_argument("--rss-share", type=float, default=0.2, help="fraction of sources that are RSS feeds")
+    parser.add_argument("--page-bytes", type=int, default=20_000)
+    parser.add_argument("--rss-items", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="stand-in server delay per response (s)")
+    parser.add_argument("--change-rate", type=float, default=1.0)
+    parser.add_argument("--interval", type=float, default=0.5, help="poll interval per source (s)")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=1000)
+    parser.add_argument("--overflow", choices=Scan.SourceQueue.POLICIES, default="block")
+    parser.add_argument("--consumer-delay", type=float, default=0.0, help="consumer time per item (s)")
+    parser.add_argument("--duration", type=float, default=10.0, help="scanner scenario length (s)")
+    parser.add_argument("--docs", type=int, default=500, help="documents for codec/merge/kb scenarios")
+    parser.add_argument("--kb-batch", type=int, default=50, help="entries per save_kb call")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the stand-in and the kb scenario")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed docs/sec drop vs baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+    output = {"config": vars(args), "results": results, "regressions": regressions}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+    for r in results:
+        print(f"{r['scenario']:<14} {r['docs']:>7} docs  {r['docs_per_sec']:>10} docs/s  "
+              f"p50={r['p50_ms']}ms  p99={r['p99_ms']}ms  peak_rss={r['peak_rss_mb']}MB"
+              + (f"  vs_baseline={r['vs_baseline']:+.1%}" if "vs_baseline" in r else ""))
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
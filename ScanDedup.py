@@ -0,0 +1,88 @@
+# File: scandedup.py
+# Near-duplicate detection for scanned content.
+#
+# Each document gets a 64-bit SimHash over its word shingles; documents
+# whose fingerprints differ in at most ``max_distance`` bits are treated
+# as near-duplicates. The index splits fingerprints into max_distance + 1
+# bands, so any near-duplicate shares at least one whole band with the
+# document and only those band buckets need to be compared.
+import hashlib, re, threading
+
+SHINGLE = 3  # words per shingle
+_TOKEN = re.compile(r"[A-Z0-9]+")
+# _BIT_TABLES[k] maps a byte to 1 if bit k is set, else 0.
+_BIT_TABLES = [bytes((c >> k) & 1 for c in range(256)) for k in range(8)]
+
+def simhash(text, shingle=SHINGLE):
+    tokens = _TOKEN.findall(text.upper())
+    features = {" ".join(tokens[i:i + shingle]) for i in range(max(len(tokens) - shingle + 1, 1))}
+    features.discard("")
+    if not features:
+        return 0
+    data = b"".join(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest() for f in features)
+    # Majority vote per bit, counted one byte column at a time in C
+    # instead of looping over 64 bits per feature in Python.
+    fp, half = 0, len(features) / 2
+    for j in range(8):
+        column = data[j::8]
+        for k in range(8):
+            if column.translate(_BIT_TABLES[k]).count(1) > half:
+                fp |= 1 << (j * 8 + k)
+    return fp
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+class SimHashIndex:
+    """Thread-safe LSH index of SimHash fingerprints keyed by document."""
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        self._bounds = [(64 * i // bands, 64 * (i + 1) // bands) for i in range(bands)]
+        self._buckets = [{} for _ in self._bounds]
+        self._fps = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._fps)
+
+    def __contains__(self, doc):
+        return doc in self._fps
+
+    def _bands(self, fp):
+        return [(fp >> lo) & ((1 << (hi - lo)) - 1) for lo, hi in self._bounds]
+
+    def find(self, fp, exclude=None):
+        """Return the closest indexed document within max_distance of ``fp``, or None."""
+        best, best_dist = None, self.max_distance + 1
+        with self._lock:
+            for buckets, band in zip(self._buckets, self._bands(fp)):
+                for doc in buckets.get(band, ()):
+                    if doc == exclude:
+                        continue
+                    dist = hamming(fp, self._fps[doc])
+                    if dist < best_dist:
+                        best, best_dist = doc, dist
+        return best
+
+    def add(self, doc, fp):
+        with self._lock:
+            self._remove(doc)
+            self._fps[doc] = fp
+            for buckets, band in zip(self._buckets, self._bands(fp)):
+                buckets.setdefault(band, set()).add(doc)
+
+    def remove(self, doc):
+        with self._lock:
+            self._remove(doc)
+
+    def _remove(self, doc):
+        fp = self._fps.pop(doc, None)
+        if fp is None:
+            return
+        for buckets, band in zip(self._buckets, self._bands(fp)):
+            bucket = buckets[band]
+            bucket.discard(doc)
+            if not bucket:
+                del buckets[band]
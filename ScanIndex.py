@@ -0,0 +1,106 @@
+# File: scanindex.py
+# Incremental inverted index over scanned content.
+#
+# Postings map each term to {document: [positions]}, so a term lookup is
+# a dict access and phrase queries only check positions of documents that
+# already contain every term. Documents are ranked with BM25.
+import heapq, math, re, threading
+
+_TOKEN = re.compile(r"[A-Z0-9]+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+def tokenize(text):
+    return _TOKEN.findall(text.upper())
+
+def parse_query(query):
+    """Split a query into (phrases, terms); quoted parts are phrases."""
+    phrases, terms = [], []
+    for phrase, word in _QUERY.findall(query):
+        tokens = tokenize(phrase or word)
+        if len(tokens) > 1 and phrase:
+            phrases.append(tokens)
+        else:
+            terms.extend(tokens)
+    return phrases, terms
+
+class InvertedIndex:
+    """Thread-safe term/phrase index; ``add`` replaces a document's previous text."""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}   # term -> {doc: [positions]}
+        self._doc_terms = {}  # doc -> terms it contains, for removal
+        self._lengths = {}    # doc -> number of tokens
+        self._total = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, doc):
+        return doc in self._lengths
+
+    def add(self, doc, text):
+        terms = {}
+        for pos, term in enumerate(tokenize(text)):
+            terms.setdefault(term, []).append(pos)
+        length = sum(len(p) for p in terms.values())
+        with self._lock:
+            self._remove(doc)
+            for term, positions in terms.items():
+                self._postings.setdefault(term, {})[doc] = positions
+            self._doc_terms[doc] = tuple(terms)
+            self._lengths[doc] = length
+            self._total += length
+
+    def remove(self, doc):
+        with self._lock:
+            self._remove(doc)
+
+    def _remove(self, doc):
+        for term in self._doc_terms.pop(doc, ()):
+            postings = self._postings[term]
+            del postings[doc]
+            if not postings:
+                del self._postings[term]
+        self._total -= self._lengths.pop(doc, 0)
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` (doc, score) pairs matching every term and phrase."""
+        phrases, terms = parse_query(query)
+        wanted = set(terms).union(*phrases)
+        if not wanted:
+            return []
+        with self._lock:
+            lists = []
+            for term in wanted:
+                postings = self._postings.get(term)
+                if not postings:
+                    return []
+                lists.append((term, postings))
+            lists.sort(key=lambda tp: len(tp[1]))
+            rest = [p for _, p in lists[1:]]
+            docs = [d for d in lists[0][1] if all(d in p for p in rest)]
+            for phrase in phrases:
+                docs = [d for d in docs if self._has_phrase(d, phrase)]
+            n = len(self._lengths)
+            avg = self._total / n if n else 0.0
+            idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in lists}
+            scored = []
+            for doc in docs:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / avg) if avg else self.k1
+                score = 0.0
+                for term, postings in lists:
+                    tf = len(postings[doc])
+                    score += idf[term] * tf * (self.k1 + 1) / (tf + norm)
+                scored.append((doc, score))
+        return heapq.nlargest(limit, scored, key=lambda ds: ds[1])
+
+    def _has_phrase(self, doc, phrase):
+        starts = set(self._postings[phrase[0]][doc])
+        for offset, term in enumerate(phrase[1:], 1):
+            starts &= {p - offset for p in self._postings[term][doc]}
+            if not starts:
+                return False
+        return True
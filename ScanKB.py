@@ -0,0 +1,414 @@
+# File: scankb.py
+# Log-structured knowledge base for the streaming scanner.
+#
+# The KB is a directory of append-only segment files. Every flush appends
+# one checksummed batch holding only the entries that changed since the
+# previous flush, so a crash can at worst lose the batch being written:
+# a torn batch fails its checksum and is cut off on the next open.
+# Sealed segments are compacted in the background into one segment that
+# keeps only the latest value of each key.
+#
+# Only a key -> (segment, offset, length) index is kept in memory. Values
+# are read from memory-mapped segments when accessed, and every sealed
+# segment has a ".hint" file listing its records, so opening the KB reads
+# the hints instead of the values.
+import mmap, os, struct, threading, zlib
+from collections.abc import MutableMapping
+
+import LogSC
+
+_log = LogSC.get_logger("KB")
+
+# Segment header: magic, lowest segment number this segment supersedes.
+# A compacted segment replaces every segment from that number up to its
+# own, so leftovers from a compaction interrupted by a crash are ignored.
+_HEADER = struct.Struct("<4sI")
+_MAGIC = b"PKB1"
+# Batch frame: crc32 of the payload, payload length.
+_BATCH = struct.Struct("<II")
+# Record inside a batch: key length, value length (-1 marks a deletion).
+_RECORD = struct.Struct("<Ii")
+# Hint file: magic, size of the segment it describes, crc32 of the entries,
+# then one (key length, value offset, value length) + key per record.
+_HINT_HEADER = struct.Struct("<4sQI")
+_HINT_MAGIC = b"PKH1"
+_HINT = struct.Struct("<IQi")
+_DELETED = object()
+
+def _seg_name(n):
+    return f"{n:08d}.seg"
+
+def _scan_batches(buf, pos):
+    """Return ([(key, value offset, value length)], end of the last intact batch)."""
+    records = []
+    while pos + _BATCH.size <= len(buf):
+        crc, length = _BATCH.unpack_from(buf, pos)
+        start = pos + _BATCH.size
+        end = start + length
+        if end > len(buf) or zlib.crc32(buf[start:end]) != crc:
+            break
+        while start < end:
+            klen, vlen = _RECORD.unpack_from(buf, start)
+            start += _RECORD.size
+            key = bytes(buf[start:start + klen]).decode("utf-8")
+            start += klen
+            records.append((key, start, vlen))
+            start += max(vlen, 0)
+        pos = end
+    return records, pos
+
+def _pack_record(key, value):
+    k = key.encode("utf-8")
+    if value is _DELETED:
+        return _RECORD.pack(len(k), -1) + k
+    return _RECORD.pack(len(k), len(value)) + k + value
+
+def _record_size(key, vlen):
+    return _RECORD.size + len(key.encode("utf-8")) + max(vlen, 0)
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # not supported on this platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _pack_hint(seg_size, records):
+    parts = []
+    for key, voff, vlen in records:
+        k = key.encode("utf-8")
+        parts.append(_HINT.pack(len(k), voff, vlen) + k)
+    body = b"".join(parts)
+    return _HINT_HEADER.pack(_HINT_MAGIC, seg_size, zlib.crc32(body)) + body
+
+def _read_hint(path, seg_size):
+    """Return the records listed in a hint file, or None if it is missing or stale."""
+    try:
+        with open(path, "rb") as f:
+            buf = f.read()
+    except OSError:
+        return None
+    if len(buf) < _HINT_HEADER.size:
+        return None
+    magic, size, crc = _HINT_HEADER.unpack_from(buf)
+    body = memoryview(buf)[_HINT_HEADER.size:]
+    if magic != _HINT_MAGIC or size != seg_size or zlib.crc32(body) != crc:
+        return None
+    records, pos = [], _HINT_HEADER.size
+    while pos < len(buf):
+        klen, voff, vlen = _HINT.unpack_from(buf, pos)
+        pos += _HINT.size
+        records.append((buf[pos:pos + klen].decode("utf-8"), voff, vlen))
+        pos += klen
+    return records
+
+class KBStore(MutableMapping):
+    """Mapping of str keys to byte values persisted as an append-only log.
+
+    Values are stored as ``bytes(value)`` and handed back through ``wrap``,
+    read lazily from the memory-mapped segment on every access.
+    Assignments are buffered until ``flush()``, which appends them as one
+    atomic batch.
+    """
+
+    def __init__(self, path="prosc_kb", wrap=bytes, segment_bytes=64 << 20,
+                 compact_ratio=0.5, fsync=True, background=True):
+        self.path = path
+        self.wrap = wrap
+        self.segment_bytes = segment_bytes
+        self.compact_ratio = compact_ratio
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._loc = {}      # key -> (segment, value offset, value length)
+        self._size = {}     # segment -> bytes on disk
+        self._live = {}     # segment -> bytes of records that are still current
+        self._maps = {}     # segment -> mmap
+        self._dirty = {}
+        self._appended = [] # records in the active segment, for its hint file
+        os.makedirs(path, exist_ok=True)
+        self._load()
+        self._file = open(self._seg_path(self._active), "ab")
+        self._closed = threading.Event()
+        self._compact_wanted = threading.Event()
+        self._compactor = None
+        if background:
+            self._compactor = threading.Thread(target=self._compact_loop, name="prosc-kb-compact", daemon=True)
+            self._compactor.start()
+
+    def _seg_path(self, n):
+        return os.path.join(self.path, _seg_name(n))
+
+    def _hint_path(self, n):
+        return os.path.join(self.path, f"{n:08d}.hint")
+
+    def _remove_segment(self, n):
+        self._unmap(n)
+        for path in (self._hint_path(n), self._seg_path(n)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load(self):
+        segs = []
+        for name in os.listdir(self.path):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(self.path, name))
+            elif name.endswith(".seg") and name[:-4].isdigit():
+                segs.append(int(name[:-4]))
+        segs.sort()
+        bases = {}
+        for n in segs:
+            with open(self._seg_path(n), "rb") as f:
+                header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                # Crashed while creating the segment; nothing was written to it.
+                self._remove_segment(n)
+                continue
+            magic, bases[n] = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{self._seg_path(n)} is not a KB segment")
+        stale = {m for n, base in bases.items() for m in bases if base <= m < n}
+        for n in stale:
+            self._remove_segment(n)
+        segs = [n for n in bases if n not in stale]
+        for n in segs:
+            size = os.path.getsize(self._seg_path(n))
+            records = None if n == segs[-1] else _read_hint(self._hint_path(n), size)
+            if records is None:
+                records, end = _scan_batches(self._map(n), _HEADER.size)
+                if end < size:
+                    # Torn batch from an interrupted flush.
+                    self._unmap(n)
+                    with open(self._seg_path(n), "r+b") as f:
+                        f.truncate(end)
+                    size = end
+            self._size[n] = size
+            for key, voff, vlen in records:
+                self._place(key, None if vlen < 0 else (n, voff, vlen))
+        if not segs:
+            self._new_segment(1)
+        else:
+            self._active = segs[-1]
+            self._appended = records
+
+    def _map(self, n):
+        m = self._maps.get(n)
+        if m is None or len(m) < self._size.get(n, 0):
+            if m is not None:
+                m.close()
+            with open(self._seg_path(n), "rb") as f:
+                m = self._maps[n] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return m
+
+    def _unmap(self, n):
+        m = self._maps.pop(n, None)
+        if m is not None:
+            m.close()
+
+    def _place(self, key, loc):
+        old = self._loc.pop(key, None)
+        if old is not None:
+            self._live[old[0]] -= _record_size(key, old[2])
+        if loc is not None:
+            self._loc[key] = loc
+            self._live[loc[0]] = self._live.get(loc[0], 0) + _record_size(key, loc[2])
+
+    def _new_segment(self, n):
+        with open(self._seg_path(n), "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, n))
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(self.path)
+        self._active = n
+        self._size[n] = _HEADER.size
+        self._live.setdefault(n, 0)
+        self._appended = []
+
+    # --- Mapping interface ---
+    def __getitem__(self, key):
+        with self._lock:
+            value = self._dirty.get(key)
+            if value is not None:
+                if value is _DELETED:
+                    raise KeyError(key)
+                return value
+            seg, voff, vlen = self._loc[key]
+            return self.wrap(self._map(seg)[voff:voff + vlen])
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._dirty[key] = value
+
+    def __delitem__(self, key):
+        with self._lock:
+            if key not in self:
+                raise KeyError(key)
+            self._dirty[key] = _DELETED
+
+    def __contains__(self, key):
+        value = self._dirty.get(key)
+        if value is not None:
+            return value is not _DELETED
+        return key in self._loc
+
+    def __iter__(self):
+        with self._lock:
+            keys = [k for k in self._loc if k not in self._dirty]
+            keys.extend(k for k, v in self._dirty.items() if v is not _DELETED)
+        return iter(keys)
+
+    def __len__(self):
+        with self._lock:
+            n = len(self._loc)
+            for key, value in self._dirty.items():
+                if value is _DELETED:
+                    n -= key in self._loc
+                else:
+                    n += key not in self._loc
+            return n
+
+    # --- Persistence ---
+    def flush(self):
+        """Append every entry changed since the last flush as one batch."""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            parts, placed = [], []
+            pos = self._size[self._active] + _BATCH.size
+            for key, value in self._dirty.items():
+                if value is not _DELETED:
+                    value = bytes(value)
+                record = _pack_record(key, value)
+                if value is _DELETED:
+                    placed.append((key, pos + len(record), -1))
+                else:
+                    placed.append((key, pos + len(record) - len(value), len(value)))
+                parts.append(record)
+                pos += len(record)
+            payload = b"".join(parts)
+            try:
+                self._file.write(_BATCH.pack(zlib.crc32(payload), len(payload)) + payload)
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except BaseException:
+                # Drop the partial batch so later appends stay readable.
+                self._file.truncate(self._size[self._active])
+                raise
+            for key, voff, vlen in placed:
+                self._place(key, None if vlen < 0 else (self._active, voff, vlen))
+            self._appended.extend(placed)
+            self._size[self._active] = pos
+            count = len(self._dirty)
+            self._dirty.clear()
+            if pos >= self.segment_bytes:
+                self._file.close()
+                _write_atomic(self._hint_path(self._active), _pack_hint(pos, self._appended))
+                self._new_segment(self._active + 1)
+                self._file = open(self._seg_path(self._active), "ab")
+            if self._needs_compaction():
+                self._compact_wanted.set()
+            return count
+
+    def _sealed(self):
+        return sorted(n for n in self._size if n != self._active)
+
+    def _needs_compaction(self):
+        sealed = self._sealed()
+        total = sum(self._size[n] for n in sealed)
+        live = sum(self._live.get(n, 0) for n in sealed)
+        return total > 0 and total - live > total * self.compact_ratio
+
+    def compact(self):
+        """Rewrite all sealed segments into one holding only current records."""
+        with self._compact_lock:
+            with self._lock:
+                sealed = self._sealed()
+                if not sealed:
+                    return
+                current = {key: loc for key, loc in self._loc.items() if loc[0] in sealed}
+            target, base = sealed[-1], sealed[0]
+            tmp = self._seg_path(target) + ".tmp"
+            moved = {}
+            with open(tmp, "wb") as out:
+                out.write(_HEADER.pack(_MAGIC, base))
+                pos = _HEADER.size
+                for n in sealed:
+                    # Sealed segments never change, so a private mapping can
+                    # be read without holding the store lock.
+                    with open(self._seg_path(n), "rb") as f:
+                        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    with buf:
+                        parts = []
+                        batch_pos = pos + _BATCH.size
+                        for key, voff, vlen in _scan_batches(buf, _HEADER.size)[0]:
+                            if current.get(key) != (n, voff, vlen):
+                                continue
+                            record = _pack_record(key, buf[voff:voff + vlen])
+                            moved[key] = (target, batch_pos + len(record) - vlen, vlen)
+                            parts.append(record)
+                            batch_pos += len(record)
+                    if parts:
+                        payload = b"".join(parts)
+                        out.write(_BATCH.pack(zlib.crc32(payload), len(payload)) + payload)
+                        pos = batch_pos
+                out.flush()
+                os.fsync(out.fileno())
+            hint = _pack_hint(pos, [(key, voff, vlen) for key, (_, voff, vlen) in moved.items()])
+            with self._lock:
+                self._unmap(target)
+                if os.path.exists(self._hint_path(target)):
+                    os.remove(self._hint_path(target))
+                os.replace(tmp, self._seg_path(target))
+                _write_atomic(self._hint_path(target), hint)
+                for n in sealed:
+                    self._size.pop(n, None)
+                    self._live.pop(n, None)
+                self._size[target] = pos
+                self._live[target] = 0
+                for key, loc in moved.items():
+                    # Keys rewritten since the snapshot already point at a newer segment.
+                    if self._loc.get(key) == current[key]:
+                        self._loc[key] = loc
+                        self._live[target] += _record_size(key, loc[2])
+                for n in sealed[:-1]:
+                    self._remove_segment(n)
+                _fsync_dir(self.path)
+
+    def _compact_loop(self):
+        while not self._closed.is_set():
+            self._compact_wanted.wait()
+            self._compact_wanted.clear()
+            if not self._closed.is_set():
+                try:
+                    self.compact()
+                except Exception as e:
+                    _log.error("Compaction failed: %s", e)
+
+    def close(self):
+        self._closed.set()
+        self._compact_wanted.set()
+        if self._compactor is not None:
+            self._compactor.join()
+        self.flush()
+        self._file.close()
+        with self._lock:
+            for n in list(self._maps):
+                self._unmap(n)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
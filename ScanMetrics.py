@@ -0,0 +1,156 @@
+# File: scanmetrics.py
+# In-process counters, gauges and fixed-bucket histograms for the scanner,
+# keyed by metric name and source, with Prometheus text output.
+#
+# Recording is a dict lookup, a bisect over a short bucket tuple and a few
+# additions under one lock, so it stays on in production. Gauges are
+# callables read only when metrics are rendered or snapshotted.
+import threading, time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds; names ending in "_bytes" use BYTE_BUCKETS, the rest seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+BYTE_BUCKETS = tuple(1 << n for n in range(10, 25, 2))  # 1 KiB .. 16 MiB
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (inf past the last bound)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        return {"count": self.count, "sum": round(self.sum, 6),
+                "mean": round(self.sum / self.count, 6) if self.count else None,
+                "p50": self.quantile(0.5), "p99": self.quantile(0.99)}
+
+def _labels(source, **extra):
+    pairs = ([("source", source)] if source else []) + list(extra.items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """Thread-safe metric registry; ``source`` is "" for scanner-wide metrics."""
+
+    def __init__(self, prefix="prosc_scan"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, source) -> number
+        self._histograms = {}  # (name, source) -> Histogram
+        self._gauges = {}      # name -> callable
+
+    def inc(self, name, source="", value=1):
+        key = (name, source)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, source=""):
+        key = (name, source)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(
+                    BYTE_BUCKETS if name.endswith("_bytes") else LATENCY_BUCKETS)
+            hist.observe(value)
+
+    @contextmanager
+    def time(self, name, source=""):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, source)
+
+    def gauge(self, name, fn):
+        """Register ``fn()`` as the current value of gauge ``name``."""
+        with self._lock:
+            self._gauges[name] = fn
+
+    def forget(self, source):
+        """Drop every counter and histogram recorded for ``source``."""
+        with self._lock:
+            for table in (self._counters, self._histograms):
+                for key in [k for k in table if k[1] == source]:
+                    del table[key]
+
+    def _copy(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {k: (h.bounds, list(h.counts), h.sum, h.count) for k, h in self._histograms.items()}
+            gauges = dict(self._gauges)
+        return counters, histograms, gauges
+
+    def snapshot(self):
+        """{"counters": {name: {source: n}}, "histograms": {name: {source: summary}}, "gauges": {name: v}}."""
+        counters, histograms, gauges = self._copy()
+        result = {"counters": {}, "histograms": {}, "gauges": {}}
+        for (name, source), value in counters.items():
+            result["counters"].setdefault(name, {})[source] = value
+        for (name, source), (bounds, counts, total, count) in histograms.items():
+            hist = Histogram(bounds)
+            hist.counts, hist.sum, hist.count = counts, total, count
+            result["histograms"].setdefault(name, {})[source] = hist.summary()
+        for name, fn in gauges.items():
+            result["gauges"][name] = fn()
+        return result
+
+    def slowest(self, name="fetch_seconds", n=10):
+        """The ``n`` sources with the highest mean ``name``, as [(source, mean)]."""
+        with self._lock:
+            means = [(source, h.sum / h.count) for (metric, source), h in self._histograms.items()
+                     if metric == name and source and h.count]
+        return sorted(means, key=lambda item: item[1], reverse=True)[:n]
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        counters, histograms, gauges = self._copy()
+        lines = []
+        for name in sorted({n for n, _ in counters}):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} counter")
+            for (metric, source), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{full}{_labels(source)} {_number(value)}")
+        for name in sorted({n for n, _ in histograms}):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} histogram")
+            for (metric, source), (bounds, counts, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, n in zip(bounds + (float("inf"),), counts):
+                    cumulative += n
+                    lines.append(f"{full}_bucket{_labels(source, le=_number(bound))} {cumulative}")
+                lines.append(f"{full}_sum{_labels(source)} {_number(float(total))}")
+                lines.append(f"{full}_count{_labels(source)} {count}")
+        for name, fn in sorted(gauges.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} gauge")
+            lines.append(f"{full} {_number(fn())}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,243 @@
+# File: scanshard.py
+# Multi-process scanning: sources are split across worker processes by a
+# consistent-hash ring, each worker runs its own StreamingScanner with its
+# own KB shard and fetch state, and their results are merged into one stream.
+#
+# Adding or removing a worker only moves the sources whose ring position
+# falls next to that worker's virtual nodes (about 1/N of them); everything
+# else keeps its worker, KB shard and change-detection state.
+import hashlib, multiprocessing, os, queue, threading, time
+from bisect import bisect_right, insort
+from collections import deque
+
+import Scan
+
+# --- Consistent-Hash Ring ---
+def _ring_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Maps keys to nodes; each node owns ``vnodes`` points on a 64-bit ring."""
+
+    def __init__(self, nodes=(), vnodes=64):
+        self.vnodes = vnodes
+        self._points = []   # sorted ring positions
+        self._owner = {}    # position -> node
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, node):
+        return node in self._nodes
+
+    @property
+    def nodes(self):
+        return sorted(self._nodes)
+
+    def add(self, node):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _ring_hash(f"{node}#{i}")
+            self._owner[point] = node
+            insort(self._points, point)
+
+    def remove(self, node):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [p for p in self._points if self._owner[p] != node]
+        self._owner = {p: self._owner[p] for p in self._points}
+
+    def node_for(self, key):
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        i = bisect_right(self._points, _ring_hash(key)) % len(self._points)
+        return self._owner[self._points[i]]
+
+    def assign(self, sources):
+        """Split ``sources`` into {node: [src]} by source key; every node gets a list."""
+        shards = {node: [] for node in self._nodes}
+        for src in sources:
+            shards[self.node_for(Scan.source_key(src))].append(src)
+        return shards
+
+# --- Worker Process ---
+def _worker(name, shard_dir, sources, options, commands, results):
+    os.makedirs(shard_dir, exist_ok=True)
+    Scan.KB_DIR = os.path.join(shard_dir, "kb")
+    Scan.KB_FILE = os.path.join(shard_dir, "kb.json")  # no legacy import per shard
+    Scan.FETCH_STATE_FILE = os.path.join(shard_dir, "fetch_state.json")
+    scanner = Scan.StreamingScanner(sources, **options)
+    scanner.start()
+    try:
+        while True:
+            try:
+                op, arg = commands.get_nowait()
+            except queue.Empty:
+                pass
+            else:
+                if op == "stop":
+                    break
+                if op == "reconfigure":
+                    scanner.reconfigure(arg)
+            batch = scanner.fetch_latest(max_items=256, timeout=0.2)
+            if batch:
+                results.put(batch)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scanner.stop()
+        scanner.join()
+        # Items the scanner queued after the last batch still belong to the stream.
+        batch = scanner.fetch_latest()
+        if batch:
+            results.put(batch)
+        scanner.kb.close()
+
+class _Shard:
+    __slots__ = ("name", "process", "commands")
+
+    def __init__(self, name, process, commands):
+        self.name = name
+        self.process = process
+        self.commands = commands
+
+# --- Coordinator ---
+class ShardCoordinator:
+    """Runs one StreamingScanner process per shard and merges their output.
+
+    Shard ``name`` keeps its KB and fetch state under ``base_dir/name``, so
+    a restarted coordinator with the same worker names resumes where it
+    left off. ``scanner_options`` are passed to every StreamingScanner and
+    must be picklable. ``fetch_latest`` returns (src, atomic) items from all
+    shards, like StreamingScanner.fetch_latest.
+    """
+
+    def __init__(self, sources, workers=None, base_dir="prosc_shards", vnodes=64, **scanner_options):
+        self.sources = list(sources)
+        self.base_dir = base_dir
+        self.options = scanner_options
+        self.ring = HashRing(vnodes=vnodes)
+        self._ctx = multiprocessing.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._pending = deque()
+        self._shards = {}
+        self._lock = threading.Lock()       # ring and shard table
+        self._read_lock = threading.Lock()  # result stream
+        for i in range(workers or os.cpu_count() or 1):
+            self.ring.add(f"shard-{i}")
+        self._started = False
+
+    def _spawn(self, name, sources):
+        commands = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker, name=f"prosc-{name}", daemon=True,
+            args=(name, os.path.join(self.base_dir, name), sources, self.options, commands, self._results))
+        process.start()
+        self._shards[name] = _Shard(name, process, commands)
+
+    def _rebalance(self):
+        for name, sources in self.ring.assign(self.sources).items():
+            shard = self._shards.get(name)
+            if shard is None:
+                self._spawn(name, sources)
+            else:
+                shard.commands.put(("reconfigure", sources))
+
+    def _drain(self):
+        while True:
+            try:
+                self._pending.extend(self._results.get_nowait())
+            except queue.Empty:
+                return
+
+    def _retire(self, shards, timeout=30):
+        for shard in shards:
+            shard.commands.put(("stop", None))
+        # Keep draining while they exit: a worker blocked flushing results
+        # into the pipe would otherwise never finish.
+        deadline = time.monotonic() + timeout
+        for shard in shards:
+            while shard.process.is_alive() and time.monotonic() < deadline:
+                with self._read_lock:
+                    self._drain()
+                shard.process.join(0.1)
+            if shard.process.is_alive():
+                shard.process.terminate()
+        with self._read_lock:
+            self._drain()
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._rebalance()
+        return self
+
+    def assignment(self):
+        """{shard name: [source keys]} under the current ring."""
+        with self._lock:
+            return {name: [Scan.source_key(s) for s in sources]
+                    for name, sources in self.ring.assign(self.sources).items()}
+
+    def add_worker(self, name=None):
+        """Add a shard, moving only the sources the ring now maps to it; returns its name."""
+        with self._lock:
+            if name is None:
+                i = len(self.ring)
+                while f"shard-{i}" in self.ring:
+                    i += 1
+                name = f"shard-{i}"
+            self.ring.add(name)
+            if self._started:
+                self._rebalance()
+            return name
+
+    def remove_worker(self, name):
+        """Stop shard ``name`` and hand its sources to the remaining shards."""
+        with self._lock:
+            if name not in self.ring:
+                raise KeyError(name)
+            if len(self.ring) == 1:
+                raise ValueError("Cannot remove the last shard")
+            self.ring.remove(name)
+            shard = self._shards.pop(name, None)
+            if self._started:
+                self._rebalance()
+        if shard is not None:
+            self._retire([shard])
+
+    def reconfigure(self, sources):
+        """Replace the source list; each shard only sees its own changes."""
+        with self._lock:
+            self.sources = list(sources)
+            if self._started:
+                self._rebalance()
+
+    def fetch_latest(self, max_items=None, timeout=0):
+        """Return up to ``max_items`` items from any shard, waiting up to ``timeout`` seconds for the first."""
+        with self._read_lock:
+            self._drain()
+            if not self._pending and timeout != 0:
+                try:
+                    self._pending.extend(self._results.get(timeout=timeout))
+                except queue.Empty:
+                    pass
+                self._drain()
+            n = len(self._pending) if max_items is None else min(max_items, len(self._pending))
+            return [self._pending.popleft() for _ in range(n)]
+
+    def alive(self):
+        return {name: shard.process.is_alive() for name, shard in self._shards.items()}
+
+    def stop(self):
+        with self._lock:
+            shards = list(self._shards.values())
+            self._shards.clear()
+            self._started = False
+            self._retire(shards)
@@ -0,0 +1,75 @@
+# File: scanweb.py
+# HTTP endpoints for a running StreamingScanner: full-text search,
+# Prometheus metrics (/metrics, or /metrics?format=json for a snapshot) and
+# live source registration (/sources; PUT and DELETE take ?key=<source key>).
+import time
+from flask import Flask, Response, request, jsonify
+
+MAX_SEARCH_LIMIT = 100
+
+def create_app(scanner):
+    app = Flask(__name__)
+
+    @app.route("/search")
+    def search():
+        if scanner.index is None:
+            return jsonify({"success": False, "error": "Scanner has no index"}), 404
+        query = request.args.get("q", "")
+        try:
+            limit = int(request.args.get("limit", 10))
+        except ValueError:
+            return jsonify({"success": False, "error": "limit must be an integer"}), 400
+        limit = min(max(limit, 1), MAX_SEARCH_LIMIT)
+        start = time.perf_counter()
+        hits = scanner.index.search(query, limit)
+        took_ms = (time.perf_counter() - start) * 1000
+        return jsonify({
+            "success": True,
+            "query": query,
+            "took_ms": round(took_ms, 3),
+            "results": [{"source": doc, "score": round(score, 4)} for doc, score in hits],
+        })
+
+    @app.route("/metrics")
+    def metrics():
+        if request.args.get("format") == "json":
+            return jsonify(scanner.metrics.snapshot())
+        return Response(scanner.metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/sources", methods=["GET"])
+    def list_sources():
+        return jsonify({"success": True, "sources": scanner.source_status()})
+
+    @app.route("/sources", methods=["POST"])
+    def add_source():
+        try:
+            key = scanner.add_source(request.get_json(silent=True))
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify({"success": True, "key": key}), 201
+
+    @app.route("/sources", methods=["PUT"])
+    def update_source():
+        key = request.args.get("key", "")
+        try:
+            new_key = scanner.update_source(key, request.get_json(silent=True))
+        except KeyError:
+            return jsonify({"success": False, "error": f"Unknown source: {key}"}), 404
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        return jsonify({"success": True, "key": new_key})
+
+    @app.route("/sources", methods=["DELETE"])
+    def remove_source():
+        key = request.args.get("key", "")
+        purge = request.args.get("purge", "").lower() in ("1", "true", "yes")
+        try:
+            scanner.remove_source(key, purge=purge)
+        except KeyError:
+            return jsonify({"success": False, "error": f"Unknown source: {key}"}), 404
+        return jsonify({"success": True, "key": key, "purged": purge})
+
+    return app
+
+def run_web(scanner, host="0.0.0.0", port=5001):
+    create_app(scanner).run(host=host, port=port)
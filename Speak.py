@@ -7,6 +7,10 @@ import threading
 import time
 from flask import Flask, request, jsonify, render_template_string
 
+import LogSC
+
+_log = LogSC.get_logger("Speak")
+
 # -------------------------
 # Speak Client
 # -------------------------
@@ -14,7 +18,8 @@ try:
     import pyttsx3
     import speech_recognition as sr
 except ImportError:
-    print("ติดตั้ง pyttsx3, speechrecognition, pyaudio ก่อนใช้งาน")
+    _log.error("ติดตั้ง pyttsx3, speechrecognition, pyaudio ก่อนใช้งาน")
+    LogSC.flush()
     exit()
 
 class SpeakClient:
@@ -23,23 +28,23 @@ class SpeakClient:
         self.recognizer = sr.Recognizer()
 
     def say(self, text):
-        print(f"[Speak] {text}")
+        _log.info("%s", text)
         self.engine.say(text)
         self.engine.runAndWait()
 
     def listen(self):
         with sr.Microphone() as source:
-            print("[Speak] Listening...")
+            _log.info("Listening...")
             audio = self.recognizer.listen(source)
             try:
                 text = self.recognizer.recognize_google(audio)
-                print(f"[Speak] Heard: {text}")
+                _log.info("Heard: %s", text)
                 return text
             except sr.UnknownValueError:
-                print("[Speak] Could not understand audio")
+                _log.warning("Could not understand audio")
                 return ""
             except sr.RequestError as e:
-                print(f"[Speak] Recognition error: {e}")
+                _log.error("Recognition error: %s", e)
                 return ""
 
 # -------------------------
@@ -93,11 +98,11 @@ def voice_loop():
 # Main
 # -------------------------
 def main():
-    print("[Speak] Starting Speak Client...")
+    _log.info("Starting Speak Client...")
 
     # Run web dashboard in separate thread
     threading.Thread(target=run_web, daemon=True).start()
-    print("Web dashboard running at http://localhost:5000")
+    _log.info("Web dashboard running at http://localhost:5000")
 
     # Run voice listening loop
     voice_loop()
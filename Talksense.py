@@ -10,6 +10,11 @@ import sys
 import os
 from flask import Flask, request, jsonify, render_template_string
 
+import LogSC
+
+_log = LogSC.get_logger("TalkSense")
+_update_log = LogSC.get_logger("AutoUpdate")
+
 # -------------------------
 # Speak / TalkSense Client
 # -------------------------
@@ -17,7 +22,8 @@ try:
     import pyttsx3
     import speech_recognition as sr
 except ImportError:
-    print("ติดตั้ง pyttsx3, speechrecognition, pyaudio ก่อนใช้งาน")
+    _log.error("ติดตั้ง pyttsx3, speechrecognition, pyaudio ก่อนใช้งาน")
+    LogSC.flush()
     sys.exit()
 
 class TalkSenseClient:
@@ -26,23 +32,23 @@ class TalkSenseClient:
         self.recognizer = sr.Recognizer()
 
     def say(self, text):
-        print(f"[TalkSense] {text}")
+        _log.info("%s", text)
         self.engine.say(text)
         self.engine.runAndWait()
 
     def listen(self):
         with sr.Microphone() as source:
-            print("[TalkSense] Listening...")
+            _log.info("Listening...")
             audio = self.recognizer.listen(source)
             try:
                 text = self.recognizer.recognize_google(audio)
-                print(f"[TalkSense] Heard: {text}")
+                _log.info("Heard: %s", text)
                 return text
             except sr.UnknownValueError:
-                print("[TalkSense] Could not understand audio")
+                _log.warning("Could not understand audio")
                 return ""
             except sr.RequestError as e:
-                print(f"[TalkSense] Recognition error: {e}")
+                _log.error("Recognition error: %s", e)
                 return ""
 
 # -------------------------
@@ -88,14 +94,15 @@ def run_web():
 def auto_update(repo_path="."):
     while True:
         try:
-            print("[AutoUpdate] Checking for updates...")
+            _update_log.info("Checking for updates...")
             result = subprocess.run(["git", "pull"], cwd=repo_path, capture_output=True, text=True)
-            print(f"[AutoUpdate] {result.stdout}")
+            _update_log.info("%s", result.stdout)
             if "Already up to date." not in result.stdout:
-                print("[AutoUpdate] Updates found, restarting...")
+                _update_log.info("Updates found, restarting...")
+                LogSC.flush()  # execv discards anything still buffered
                 os.execv(sys.executable, ["python"] + sys.argv)
         except Exception as e:
-            print(f"[AutoUpdate] Error: {e}")
+            _update_log.error("Error: %s", e)
         time.sleep(60)  # check every 60 seconds
 
 # -------------------------
@@ -112,11 +119,11 @@ def voice_loop():
 # Main
 # -------------------------
 def main():
-    print("[TalkSense] Starting TalkSense Client...")
+    _log.info("Starting TalkSense Client...")
 
     # Run web dashboard
     threading.Thread(target=run_web, daemon=True).start()
-    print("Web dashboard running at http://localhost:5000")
+    _log.info("Web dashboard running at http://localhost:5000")
 
     # Run auto-update
     threading.Thread(target=auto_update, daemon=True).start()